@@ -0,0 +1,98 @@
+"""
+@author: ChingHongFung
+Batch path queries: many (start, end) pairs against one map. The map is prepared once (portal groups and portal edges) and a
+single SearchState is reused by every query; its generation counter means nothing is re-initialised between queries, where
+algorithm() used to build g_score/f_score dicts the size of the whole grid for each one.
+
+    engine = BatchSolver(grid)
+    results = engine.solve_batch([((0, 0), (10, 12)), ((3, 4), (40, 2))])
+    results.costs[1], results.get_path(1), results.queries_per_second
+
+Results come back as flat arrays with one entry per query rather than a SearchResult object per query. on_stats (and timed)
+work as for solver.solve(): the callback gets the SearchStats of every query as it is solved.
+"""
+
+import time
+from array import array
+
+from search_state import SearchState
+from solver import PreparedMap, SearchStats, search
+
+# Cost stored for a query with no path
+NO_PATH = -1
+
+class BatchResult:
+    def __init__(self, cols):
+        self.cols = cols
+        self.costs = array("i") # Path cost per query, NO_PATH when there is none
+        self.expanded = array("i") # Nodes expanded per query
+        self.path_offsets = array("i", [0]) # Path of query i is path_cells[path_offsets[i]:path_offsets[i + 1]]
+        self.path_cells = array("i") # Cell indices of all paths, one after the other
+        self.elapsed = 0.0
+
+    def __len__(self):
+        return len(self.costs)
+
+    @property
+    def queries_per_second(self):
+        if not self.elapsed:
+            return float("inf")
+        return len(self.costs) / self.elapsed
+
+    def add(self, result):
+        self.expanded.append(result.stats.expanded)
+        if result.found:
+            self.costs.append(result.cost)
+            self.path_cells.extend(result.path)
+        else:
+            self.costs.append(NO_PATH)
+        self.path_offsets.append(len(self.path_cells))
+
+    def found(self, i):
+        return self.costs[i] != NO_PATH
+
+    # Path of query i as a list of (row, col), None if no path was found
+    def get_path(self, i):
+        if not self.found(i):
+            return None
+        cells = self.path_cells[self.path_offsets[i]:self.path_offsets[i + 1]]
+        return [divmod(index, self.cols) for index in cells]
+
+class BatchSolver:
+    def __init__(self, grid, portals=None, open_list="binary", landmarks=None, timed=False, on_stats=None):
+        if isinstance(grid, PreparedMap):
+            self.prepared = grid
+        else:
+            self.prepared = PreparedMap(grid, portals)
+        self.grid = self.prepared.grid
+        self.open_list = open_list
+        self.landmarks = landmarks
+        self.timed = timed
+        self.on_stats = on_stats
+        self.state = SearchState(len(self.grid))
+
+    # Search between two cell indices with the batch's settings
+    def search(self, start, end):
+        result = search(self.prepared, start, end, self.state, open_list=self.open_list, landmarks=self.landmarks,
+                        stats=SearchStats(self.timed))
+        if self.on_stats is not None:
+            self.on_stats(result.stats)
+        return result
+
+    # Solve a single query; start and end are (row, col)
+    def solve(self, start, end):
+        grid = self.grid
+        result = self.search(grid.index(*start), grid.index(*end))
+        if result.found:
+            result.path = [grid.get_pos(index) for index in result.path]
+        return result
+
+    # Solve every (start, end) pair in queries (any iterable) and time the whole batch
+    def solve_batch(self, queries):
+        grid = self.grid
+        results = BatchResult(grid.cols)
+        begin = time.perf_counter()
+        for start, end in queries:
+            results.add(self.search(grid.index(*start), grid.index(*end)))
+        results.elapsed = time.perf_counter() - begin
+        return results
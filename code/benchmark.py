@@ -0,0 +1,342 @@
+"""
+@author: ChingHongFung
+Benchmark of the search logic of every iteration of the project (source.py, Iteration1-3 and final_version.py) on generated
+maps, with no window open. Each variant's own algorithm() is run exactly as its main() would run it after the space bar
+(update_neighbors(), portals prepared the way that version did) with a draw() that only counts expansions. For every run
+it reports wall time, nodes expanded, peak Python memory (tracemalloc, measured on a second run so it does not slow the
+timed one), path cost and the gap to the optimal cost from dijkstra.py, and writes one JSON object per run.
+
+    python benchmark.py --sizes 20 40 60 --seeds 3 --out results.jsonl
+
+The iteration scripts open a window and call main() when imported, so they are not imported: their source is parsed and
+the module level main() call and set_mode() assignment are left out before it is run. Each run happens in its own process
+with a time limit, since early versions can take very long on larger maps (Iteration3's add_portal_neighbors() can grow
+neighbor lists without bound). A variant is marked unsupported on maps using a feature it does not have (costs before
+Iteration2, portals before Iteration3, a second portal type before final_version).
+
+With --methods it compares the search methods of solver.solve() instead, on the same maps and in this process: wall time,
+nodes expanded and path cost of each, then per family the median of each method's expansions relative to the first one.
+
+    python benchmark.py --methods astar jps bidirectional --families maze random --sizes 101 201 --seeds 10
+"""
+
+import argparse
+import ast
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from dijkstra import UNREACHABLE, dijkstra
+from grid_map import GridMap
+from solver import PreparedMap, solve
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+VARIANTS = ["source", "Iteration1", "Iteration2", "Iteration3", "final_version"]
+FAMILIES = ["random", "maze", "costs", "portals"]
+METHODS = ["astar", "jps", "bidirectional"]
+
+# What a variant's algorithm() can represent: costs, portals and the number of portal types
+FEATURES = {
+    "source": (False, 0),
+    "Iteration1": (False, 0),
+    "Iteration2": (True, 0),
+    "Iteration3": (True, 1),
+    "final_version": (True, 2),
+}
+
+# A generated benchmark map: rows of costs (0 for a barrier), portal groups as lists of (row, col) and the query
+class BenchMap:
+    def __init__(self, costs, portals, start, end):
+        self.costs = costs
+        self.portals = portals
+        self.start = start
+        self.end = end
+        self.size = len(costs)
+
+    def uses_costs(self):
+        return any(cost > 1 for row in self.costs for cost in row)
+
+    def free_cells(self):
+        portal_cells = {cell for group in self.portals for cell in group}
+        return [(row, col) for row in range(self.size) for col in range(self.size)
+                if self.costs[row][col] and (row, col) not in portal_cells]
+
+# Maps of one family; every map is square, as make_grid() only builds square grids
+def make_map(family, size, seed):
+    rng = random.Random("%s-%d-%d" % (family, size, seed))
+    portals = []
+    if family == "random":
+        costs = [[0 if rng.random() < 0.25 else 1 for _ in range(size)] for _ in range(size)]
+    elif family == "maze":
+        costs = make_maze(size, rng)
+    elif family == "costs":
+        costs = [[0 if rng.random() < 0.1 else rng.choice((1, 1, 1, 2, 3, 5, 8, 13)) for _ in range(size)]
+                 for _ in range(size)]
+    elif family == "portals":
+        costs = [[0 if rng.random() < 0.2 else 1 for _ in range(size)] for _ in range(size)]
+        open_cells = [(row, col) for row in range(size) for col in range(size) if costs[row][col]]
+        portals = [rng.sample(open_cells, max(2, size // 8))]
+    else:
+        raise ValueError("Unknown map family %r, pick one of %s" % (family, ", ".join(FAMILIES)))
+    bench_map = BenchMap(costs, portals, None, None)
+    bench_map.start, bench_map.end = rng.sample(bench_map.free_cells(), 2)
+    return bench_map
+
+# Maze carved by a randomised depth first search on the odd cells, with a few walls knocked out to make loops
+def make_maze(size, rng):
+    costs = [[0] * size for _ in range(size)]
+    cells = (size - 1) // 2
+    stack = [(0, 0)]
+    costs[1][1] = 1
+    seen = {(0, 0)}
+    while stack:
+        row, col = stack[-1]
+        options = [(row + dr, col + dc) for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                   if 0 <= row + dr < cells and 0 <= col + dc < cells and (row + dr, col + dc) not in seen]
+        if not options:
+            stack.pop()
+            continue
+        next_row, next_col = rng.choice(options)
+        seen.add((next_row, next_col))
+        costs[2 * next_row + 1][2 * next_col + 1] = 1
+        costs[row + next_row + 1][col + next_col + 1] = 1
+        stack.append((next_row, next_col))
+    for _ in range(size * size // 50):
+        costs[rng.randrange(1, size - 1)][rng.randrange(1, size - 1)] = 1
+    return costs
+
+# Run a variant's source without the main() call and set_mode() assignment it makes at module level
+def load_variant(name):
+    path = os.path.join(CODE_DIR, name + ".py")
+    with open(path) as source_file:
+        tree = ast.parse(source_file.read(), path)
+    def runs_window(node):
+        for child in ast.walk(node):
+            if isinstance(child, ast.Call):
+                function = child.func
+                if isinstance(function, ast.Name) and function.id == "main":
+                    return True
+                if isinstance(function, ast.Attribute) and function.attr == "set_mode":
+                    return True
+        return False
+    tree.body = [node for node in tree.body if not (isinstance(node, (ast.Expr, ast.Assign)) and runs_window(node))]
+    module = {"__name__": "benchmark_" + name, "__file__": path}
+    exec(compile(tree, path, "exec"), module)
+    return module
+
+# Set up the variant's spots for bench_map and run its algorithm(); returns (path as (row, col) from start to end or
+# None, nodes expanded)
+def run_variant(module, bench_map):
+    size = bench_map.size
+    grid = module["make_grid"](size, size)
+    for row in range(size):
+        for col in range(size):
+            spot = grid[row][col]
+            if not bench_map.costs[row][col]:
+                spot.make_barrier()
+            for _ in range(bench_map.costs[row][col] - 1):
+                spot.add_cost()
+    for group, cells in enumerate(bench_map.portals):
+        for row, col in cells:
+            spot = grid[row][col]
+            if "make_portal" in dir(spot):
+                spot.make_portal()
+            else:
+                (spot.make_portal_purple if group else spot.make_portal_pink)()
+    start, end = grid[bench_map.start[0]][bench_map.start[1]], grid[bench_map.end[0]][bench_map.end[1]]
+    start.make_start()
+    end.make_end()
+
+    # draw() is called once per expansion (except the one that pops the end) until the path is redrawn
+    counter = {"draws": 0, "path": None}
+    def draw():
+        if counter["path"] is None:
+            counter["draws"] += 1
+    original = module["reconstruct_path"]
+    def reconstruct_path(came_from, current, draw):
+        if isinstance(came_from, dict):
+            spot = current
+            path = [spot.get_pos()]
+            while spot in came_from:
+                spot = came_from[spot]
+                path.append(spot.get_pos())
+            counter["path"] = path[::-1]
+        else:
+            counter["path"] = list(came_from) + [bench_map.end] # final_version passes the path without its end
+        return original(came_from, current, lambda: None)
+    module["reconstruct_path"] = reconstruct_path
+
+    if "check_portal" in module and "add_portal_neighbors" not in module:
+        module["algorithm"](draw, grid, start, end, *module["check_portal"](grid))
+    else:
+        portals = module["check_portal"](grid) if "check_portal" in module else None
+        for row in grid:
+            for spot in row:
+                spot.update_neighbors(grid)
+        if portals is None:
+            module["algorithm"](draw, grid, start, end)
+        else:
+            module["add_portal_neighbors"](portals)
+            module["algorithm"](draw, grid, start, end, portals)
+    path = counter["path"]
+    return path, counter["draws"] + (path is not None)
+
+# Optimal cost of the query and a check for each step of a path, using the same edges as the solver
+def reference(bench_map):
+    grid = GridMap.from_costs(bench_map.costs)
+    prepared = PreparedMap(grid, bench_map.portals)
+    dist = dijkstra(grid, prepared.portal_table, grid.index(*bench_map.start))
+    optimal = dist[grid.index(*bench_map.end)]
+    def is_step(a, b):
+        a, b = grid.index(*a), grid.index(*b)
+        return b in grid.get_neighbors(a) or b in prepared.portal_table.get_neighbors(a)
+    return (None if optimal == UNREACHABLE else optimal), is_step
+
+# Body of the process running one benchmark job; sends back the result record
+def run_job(job, connection, memory_limit):
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1") # numpy (used by the renderer) reserves memory per thread
+    if memory_limit:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (ImportError, ValueError):
+            pass
+    record = dict(job)
+    try:
+        import pygame
+        bench_map = make_map(job["family"], job["size"], job["seed"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            # The variants poll pygame.event.get() while searching, and call pygame.quit() when there is no path
+            pygame.display.init()
+            module = load_variant(job["variant"])
+            started = time.perf_counter()
+            path, expanded = run_variant(module, bench_map)
+            record["seconds"] = time.perf_counter() - started
+            record["expanded"] = expanded
+            pygame.display.init()
+            module = load_variant(job["variant"])
+            tracemalloc.start()
+            run_variant(module, bench_map)
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        optimal, is_step = reference(bench_map)
+        record["optimal"] = optimal
+        if path is None:
+            record["status"] = "ok" if optimal is None else "missed"
+        else:
+            valid = path[0] == bench_map.start and all(is_step(a, b) for a, b in zip(path, path[1:]))
+            record["cost"] = sum(bench_map.costs[row][col] for row, col in path[1:])
+            record["status"] = "ok" if valid else "invalid_path"
+            if valid and optimal:
+                record["gap"] = (record["cost"] - optimal) / optimal
+    except MemoryError:
+        record["status"] = "memory"
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = "%s: %s" % (type(error).__name__, error)
+    connection.send(record)
+
+def run_benchmark(variants, families, sizes, seeds, timeout=120, memory_limit=2 << 30, out=None):
+    context = multiprocessing.get_context("spawn")
+    records = []
+    for family in families:
+        for size in sizes:
+            for seed in range(seeds):
+                bench_map = make_map(family, size, seed)
+                for variant in variants:
+                    job = {"variant": variant, "family": family, "size": size, "seed": seed}
+                    supports_costs, portal_types = FEATURES.get(variant, (True, 2))
+                    if bench_map.uses_costs() and not supports_costs or len(bench_map.portals) > portal_types:
+                        record = dict(job, status="unsupported")
+                    else:
+                        receiver, sender = context.Pipe(duplex=False)
+                        process = context.Process(target=run_job, args=(job, sender, memory_limit))
+                        process.start()
+                        sender.close()
+                        if receiver.poll(timeout):
+                            record = receiver.recv()
+                        else:
+                            record = dict(job, status="timeout")
+                        process.terminate()
+                        process.join()
+                    records.append(record)
+                    if out is not None:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                    print_record(record)
+    return records
+
+def print_record(record):
+    line = "%-14s %-8s %4d %2d  %-12s" % (record["variant"], record["family"], record["size"], record["seed"],
+                                          record["status"])
+    if "peak_bytes" in record:
+        line += " %9.4fs %8d expanded %10d bytes" % (record["seconds"], record["expanded"], record["peak_bytes"])
+    if "error" in record:
+        line += " " + record["error"]
+    if "cost" in record:
+        line += "  cost %d (optimal %s, gap %.1f%%)" % (record["cost"], record["optimal"], 100 * record.get("gap", 0))
+    print(line)
+
+# Run every method of solver.solve() on the same maps; the first method is the one the others are compared with
+def run_methods(methods, families, sizes, seeds, out=None):
+    records = []
+    for family in families:
+        for size in sizes:
+            for seed in range(seeds):
+                bench_map = make_map(family, size, seed)
+                prepared = PreparedMap(GridMap.from_costs(bench_map.costs), bench_map.portals)
+                optimal, _ = reference(bench_map)
+                for method in methods:
+                    started = time.perf_counter()
+                    result = solve(prepared, bench_map.start, bench_map.end, method=method)
+                    record = {"method": method, "family": family, "size": size, "seed": seed,
+                              "seconds": time.perf_counter() - started, "expanded": result.stats.expanded,
+                              "cost": result.cost if result.found else None, "optimal": optimal}
+                    records.append(record)
+                    if out is not None:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                    print("%-14s %-8s %4d %2d  %9.4fs %8d expanded  cost %s (optimal %s)" % (
+                        method, family, size, seed, record["seconds"], record["expanded"], record["cost"], optimal))
+    print_method_summary(methods, records)
+    return records
+
+# Median over the maps of each family of a method's expansions divided by those of the first method
+def print_method_summary(methods, records):
+    runs = {(record["method"], record["family"], record["size"], record["seed"]): record for record in records}
+    for family in sorted({record["family"] for record in records}):
+        maps = [key[1:] for key in runs if key[0] == methods[0] and key[1] == family]
+        for method in methods[1:]:
+            ratios = [runs[(method,) + key]["expanded"] / runs[(methods[0],) + key]["expanded"] for key in maps
+                      if runs[(methods[0],) + key]["expanded"]]
+            if ratios:
+                print("%-8s %-14s expands %.2f of %s (median over %d maps, %.2f to %.2f)" % (
+                    family, method, statistics.median(ratios), methods[0], len(ratios), min(ratios), max(ratios)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search of every iteration on generated maps")
+    parser.add_argument("--variants", nargs="+", default=VARIANTS)
+    parser.add_argument("--families", nargs="+", default=FAMILIES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[20, 40, 60])
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per run")
+    parser.add_argument("--methods", nargs="+", choices=METHODS,
+                        help="compare these solve() methods instead of the iterations (the first is the baseline)")
+    parser.add_argument("--out", default="benchmark_results.jsonl", help="JSON lines file for the results")
+    args = parser.parse_args(argv)
+    with open(args.out, "w") as out:
+        if args.methods:
+            run_methods(args.methods, args.families, args.sizes, args.seeds, out=out)
+        else:
+            run_benchmark(args.variants, args.families, args.sizes, args.seeds, args.timeout, out=out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+@author: ChingHongFung
+Bidirectional A*: one search grows forwards from the start and another backwards from the end, and the path is found where
+they meet. On maze-like maps each side only has to cover about half the distance, and a start or end shut in by barriers
+is noticed as soon as the smaller side runs out of cells.
+
+Moving into a cell costs that cell's cost, so costs are not symmetric: the backward search walks edges the other way round
+and a step from a cell back to one of its neighbors pays the cost of the cell being left (as dijkstra(reverse=True) does).
+Portal edges link cells in both directions, so the same neighbor lists serve both searches.
+
+Meeting is not the end. Every time one side reaches a cell the other side has already reached, a complete path is known and
+the cheapest one so far is kept; the search carries on until no cheaper one can be left. Both heuristics are admissible and
+consistent (PortalBound, or landmarks when given), so the stopping rule of New Bidirectional A* applies and the path
+returned is optimal. How much that saves depends on the map. On 20 maps per family from
+benchmark.py --methods astar bidirectional --sizes 61 121 --seeds 10, it expands this share of the cells search() does
+(median, with the range over the maps):
+
+    maze      0.89 (0.38 to 1.18)
+    random    0.82 (0.51 to 1.31)
+    costs     0.70 (0.33 to 1.14)
+    portals   0.47 (0.17 to 1.20)
+"""
+
+from open_list import make_open_list
+from portal_index import PortalBound
+from search_state import CLOSED, OPEN
+from solver import SearchResult, SearchStats
+
+# Bidirectional search between two cell indices of a PreparedMap; the result's path is a list of cell indices like
+# solver.search(). state is the forward search's SearchState or a (forward, backward) pair of different states; whatever
+# is not given is borrowed from prepared (PreparedMap.take_state()) and handed back at the end, so nothing grid-sized is
+# allocated once the map has been searched before
+def bidirectional_search(prepared, start, end, state=None, observer=None, open_list="binary", landmarks=None,
+                         stats=None):
+    grid = prepared.grid
+    portal_table = prepared.portal_table
+    cols, cost = grid.cols, grid.cost
+    if stats is None:
+        stats = SearchStats()
+
+    if start == end:
+        stats.finish()
+        if observer:
+            observer.on_path([divmod(start, cols)])
+        return SearchResult([start], 0, stats)
+    # Nothing can be stepped into an impassable end, so the backward search would have nothing to follow
+    if not grid.passable[end]:
+        stats.finish()
+        return SearchResult(None, float("inf"), stats)
+
+    # Forward: lower bound on the cost from a cell to end. Backward: lower bound on the cost from start to a cell
+    if landmarks is not None:
+        to_end, from_start = landmarks.targets(end), landmarks.targets(start)
+        estimates = (lambda index: landmarks.estimate(index, to_end),
+                     lambda index: landmarks.estimate_from(index, from_start))
+        portal_indexes = ()
+    else:
+        bounds = (PortalBound(grid, portal_table, end), PortalBound(grid, portal_table, start))
+        estimates = (bounds[0].estimate, bounds[1].estimate)
+        portal_indexes = (bounds[0].entrances, bounds[1].entrances)
+    estimates = (stats.time_heuristic(estimates[0]), stats.time_heuristic(estimates[1]))
+
+    states = tuple(state) if isinstance(state, tuple) else (state, None)
+    borrowed = [side for side in (0, 1) if states[side] is None]
+    states = tuple(prepared.take_state() if side in borrowed else states[side] for side in (0, 1))
+    generations = (states[0].begin(), states[1].begin())
+    open_sets = (stats.time_open_list(make_open_list(open_list, len(grid))),
+                 stats.time_open_list(make_open_list(open_list, len(grid))))
+    for side, source in ((0, start), (1, end)):
+        states[side].set_g(source, 0, -1)
+        states[side].make_open(source)
+        open_sets[side].push(source, estimates[side](source))
+        stats.pushed += 1
+        stats.heuristic_evaluations += 1
+
+    fired = ({}, {}) # Portal groups listed so far by each side, see PortalTable.fire()
+
+    # Cheapest complete path found so far and the cell where its forward and backward halves meet
+    best = float("inf")
+    meet = None
+
+    # New bidirectional A* (Pijls and Post): a cell expanded by either side is finished for both, and a cell is dropped
+    # unexpanded when its own f score, or its g score plus the best the other side could still add, reaches the best path
+    while open_sets[0] and open_sets[1]:
+        # Grow the side with fewer open nodes
+        side = 0 if len(open_sets[0]) <= len(open_sets[1]) else 1
+        open_set, estimate = open_sets[side], estimates[side]
+        this, other = states[side], states[1 - side]
+        generation, other_generation = generations[side], generations[1 - side]
+        stamp, status, g_score = this.stamp, this.status, this.g
+        other_stamp, other_status, other_g = other.stamp, other.status, other.g
+
+        current = open_set.pop()
+        stats.popped += 1
+        if other_stamp[current] == other_generation and other_status[current] == CLOSED:
+            stats.stale_pops += 1
+            continue
+        status[current] = CLOSED
+        current_g = g_score[current]
+        stats.heuristic_evaluations += 1
+        if current_g + estimate(current) >= best:
+            stats.stale_pops += 1
+            continue
+        stats.heuristic_evaluations += 1
+        if current_g + open_sets[1 - side].peek()[1] - estimates[1 - side](current) >= best:
+            stats.stale_pops += 1
+            continue
+
+        stats.expanded += 1
+        # Forwards a portal step pays for the cell entered, backwards for the cell left, which is the same for the whole group
+        portal_neighbors = portal_table.fire(current, current_g + cost[current] if side else current_g, fired[side])
+        for neighbor in grid.get_neighbors(current) + portal_neighbors:
+            if stamp[neighbor] == generation and status[neighbor] == CLOSED or \
+                    other_stamp[neighbor] == other_generation and other_status[neighbor] == CLOSED:
+                continue
+            # Forwards a step pays for the cell entered, backwards for the cell left
+            temp_g_score = current_g + (cost[current] if side else cost[neighbor])
+
+            if stamp[neighbor] != generation or temp_g_score < g_score[neighbor]:
+                this.set_g(neighbor, temp_g_score, current)
+                open_set.push(neighbor, temp_g_score + estimate(neighbor))
+                stats.relaxations += 1
+                stats.heuristic_evaluations += 1
+                stats.pushed += 1
+                if observer:
+                    observer.on_relax(divmod(neighbor, cols), temp_g_score)
+                if status[neighbor] != OPEN:
+                    status[neighbor] = OPEN
+                    if observer:
+                        observer.on_open(divmod(neighbor, cols))
+                if other_stamp[neighbor] == other_generation and temp_g_score + other_g[neighbor] < best:
+                    best = temp_g_score + other_g[neighbor]
+                    meet = neighbor
+        open_count = len(open_sets[0]) + len(open_sets[1])
+        if open_count > stats.peak_open:
+            stats.peak_open = open_count
+
+        if observer:
+            observer.on_step()
+            if current != start and current != end:
+                observer.on_close(divmod(current, cols))
+
+    stats.finish(open_sets, portal_indexes)
+    path = None
+    if meet is not None:
+        # Forward half up to the meeting cell, then follow the backward search's came_from from there to the end
+        path = states[0].reconstruct_path(meet)
+        path.extend(reversed(states[1].reconstruct_path(meet)[:-1]))
+    for side in borrowed:
+        prepared.give_state(states[side])
+    if path is None:
+        return SearchResult(None, float("inf"), stats)
+    if observer:
+        observer.on_path([divmod(index, cols) for index in path])
+    return SearchResult(path, best, stats)
@@ -0,0 +1,36 @@
+"""
+@author: ChingHongFung
+Plain Dijkstra over a GridMap, used for exact distances (landmark tables, reference costs). Moving into a cell costs that
+cell's cost, as in the A* search.
+"""
+
+import heapq
+from array import array
+
+# Distance stored for cells that cannot be reached
+UNREACHABLE = 2 ** 31 - 1
+
+# Exact cost from source to every cell (reverse=False) or from every cell to source (reverse=True). portal_table is the
+# PortalTable from solver.prepare_neighbors(). Grid and portal edges both link cells in both directions and only the
+# cost differs (an edge u -> v costs cost[v]), so the reverse search walks the same neighbors and pays the cost of the cell
+# it is leaving instead. came_from, an array('i') with one entry per cell, is filled in with the cell each one was reached
+# from: the previous cell on a cheapest path from source, or with reverse=True the next cell on a cheapest path to source
+def dijkstra(grid, portal_table, source, reverse=False, came_from=None):
+    cost = grid.cost
+    dist = array("i", [UNREACHABLE]) * len(grid)
+    dist[source] = 0
+    open_set = [(0, source)]
+    fired = {} # Portal groups listed so far, see PortalTable.fire()
+    while open_set:
+        d, current = heapq.heappop(open_set)
+        if d > dist[current]:
+            continue
+        step = cost[current] if reverse else 0
+        for neighbor in grid.get_neighbors(current) + portal_table.fire(current, d + step, fired):
+            temp = d + (step if reverse else cost[neighbor])
+            if temp < dist[neighbor]:
+                dist[neighbor] = temp
+                if came_from is not None:
+                    came_from[neighbor] = current
+                heapq.heappush(open_set, (temp, neighbor))
+    return dist
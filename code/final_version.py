@@ -7,8 +7,13 @@ closest portal before looking for the h score to the end point. This maximises t
 """
 
 import pygame
-import math
-from queue import PriorityQueue
+
+from frame_policy import CLOSED, OPENED, FramePolicy, SearchThread
+from grid_map import PORTAL_PINK, GridMap
+from map_file import load_map, save_map
+from renderer import GridRenderer
+from search_state import SearchState
+from solver import SearchObserver, solve
 
 from pygame.constants import MOUSEBUTTONDOWN
 
@@ -26,19 +31,33 @@ GREY = (128, 128, 128)
 TURQUOISE = (64, 224, 208)
 PINK = (255, 0, 190)
 
+# File the board is saved to and loaded from (keys s and l)
+MAP_FILE = "board.map"
+
 # Create a class called spot that holds attributes such as x,y coordinate location, color, surrounding neighbors, cost of each square, portal status, etc.
 class Spot:
-    def __init__(self, row, col, width, total_rows):
+    def __init__(self, row, col, width, total_rows, canvas=None):
         self.row = row
         self.col = col
         self.x = row * width
         self.y = col * width
+        self.canvas = canvas # GridRenderer told about every colour change, if there is one
         self.color = WHITE
         self.neighbors = []
         self.width = width
         self.total_rows = total_rows
         self.cost = 1
         
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, color):
+        self._color = color
+        if self.canvas is not None:
+            self.canvas.paint(self.row, self.col, color)
+
     def get_pos(self):
         return self.row, self.col
 
@@ -110,9 +129,6 @@ class Spot:
                 r = g = b = 0
             self.color = (r, g, b)
     
-    def draw(self, win):
-        pygame.draw.rect(win, self.color, (self.x, self.y, self.width, self.width))
-    
     # Look at each spot and evaluate its neighbors; if a neighbor is a barrier or it falls out of the grid space, then it is not added to the neighbors list
     def update_neighbors(self, grid):
         self.neighbors = []
@@ -131,25 +147,13 @@ class Spot:
     def __lt__(self, other):
         return False
 
-# Use Manhattan distance as a heuristic funciton to estimate the shortest distance between two points; Do not use Euclidean distance becase path cannnot be diagonal
-def h(p1, p2):
-    x1, y1 = p1
-    x2, y2 = p2
-
-    return abs(x1 - x2) + abs(y1 - y2)
-
 # Redraw path from end to start once a solution is found
-def reconstruct_path(came_from, current, draw):
-    # Count the number of steps needed to reconstruct path (i.e. the lowest number of steps to get from start to end)
-    steps = 0
-    while current in came_from:
-        steps += 1 * current.cost
-        current = came_from[current]
-        current.make_path()
+def reconstruct_path(path, grid, draw):
+    for row, col in reversed(path):
+        grid[row][col].make_path()
         draw()
-    return steps
 
-# Create two lists for the two sets of portals to be used in add_portal_neighbors()
+# Create two lists for the two sets of portals to be handed to the solver
 def check_portal(grid):
     portals_pink=[]
     portals_purple=[]
@@ -161,131 +165,113 @@ def check_portal(grid):
                 portals_purple.append(spot)
     return portals_pink, portals_purple
 
-# Essentially add additional neighbors to those adjacent to portals
-def add_portal_neighbors(portals):
-    for i in portals:
-        for j in portals:
-            for currentNeighbor in i.neighbors:
-                # Do not add additional neighbors if i==j (already a neighbor!)
-                if i != j:
-                    for extraNeighbor in j.neighbors:
-                        # Add the additional neighbors from other portals
-                        currentNeighbor.neighbors.append(extraNeighbor)
-
-# Main Astar algorithm here             
-def algorithm(draw, grid, start, end, portals_pink, portals_purple):
-    count = 0
-    # Use a priority queue data structure to store f score, count (when a point is added), and node; queue will give lowest f score node when prompted
-    open_set = PriorityQueue() 
-    open_set.put((0, count, start)) # Set the start point with f score of 0
-    came_from = {} # A dictionary to store key value pairs linking how each node is reached from previous nodes so path drawing could be carried out in the end
-    # Set g score and f score to infinity to initialise
-    g_score = {spot: float("inf") for row in grid for spot in row}
-    g_score[start] = 0
-    f_score = {spot: float("inf") for row in grid for spot in row}
-    f_score[start] = h(start.get_pos(), end.get_pos())
-
-    open_set_hash = {start} # A dictionary to keep track of which nodes that have not been considered
-
-    while not open_set.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: # Allow pygame interface to be terminated
-                pygame.quit()
+# Visualiser for the headless solver: colours spots as they are opened and closed and redraws when the FramePolicy says so
+class SpotObserver(SearchObserver):
+    def __init__(self, draw, grid, policy=None):
+        self.draw = draw
+        self.grid = grid
+        self.policy = policy or FramePolicy()
 
-        current = open_set.get()[2] # Get current node that is to be considered
-        open_set_hash.remove(current)  # Remove is from open_set_hash as it will no longer be considered again
-
-        # Solution is found if current == end
-        if current == end:
-            steps = reconstruct_path(came_from, end, draw)
-            print("Total number of steps needed = ", steps)
-            # Repaint the colours of start, end and portals for better visualisation
-            end.make_end()
-            start.make_start()
-            for portal in portals_pink:
-                portal.make_portal_pink()
-            for portal in portals_purple:
-                portal.make_portal_purple()
-            return True
-
-        for neighbor in current.neighbors:
-            # temp_g_score is added with the cost of each neighbor block in mind
-            temp_g_score = g_score[current] + 1 * neighbor.cost
-
-            # If temp_g_score is lower than previously recorded, meaning we found a path with lower cost to get to this neighbour, update its score
-            if temp_g_score < g_score[neighbor]:
-                came_from[neighbor] = current # Track where the lower-cost path came from
-                g_score[neighbor] = temp_g_score # Update score
-
-                # Use min_portal_h to store the lowest heuristic function between current and closest portal
-                min_portal_h = float("inf")
-                for portal in portals_pink:
-                    # Do not optimise by attempting to reach closed portals
-                    if portal.is_closed():
-                        pass
-                    else: 
-                        temp_h = h(neighbor.get_pos(), portal.get_pos())
-                        if temp_h < min_portal_h:
-                            min_portal_h = temp_h
-                for portal in portals_purple:
-                    if portal.is_closed():
-                        pass
-                    else:
-                        temp_h = h(neighbor.get_pos(), portal.get_pos())
-                        if temp_h < min_portal_h:
-                            min_portal_h = temp_h
+    def on_open(self, pos):
+        self.grid[pos[0]][pos[1]].make_open() # Open neighbors to be considered next
 
-                # Take f_score to be the smaller of f score between current and end or f score between current and a close portal
-                f_score[neighbor] = min(temp_g_score + h(neighbor.get_pos(), end.get_pos()), temp_g_score + min_portal_h)
-
-                if neighbor not in open_set_hash:
-                    count += 1 # Increment the count for next node to be stored
-                    open_set.put((f_score[neighbor], count, neighbor)) 
-                    open_set_hash.add(neighbor) # Add new neighbors to the open_set_hash dictionary
-                    neighbor.make_open() # Open neighbors to be considered next
+    def on_close(self, pos):
+        self.grid[pos[0]][pos[1]].make_closed() # Close off already-considered nodes
 
+    def on_step(self):
+        if not self.policy.step():
+            return
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: # Allow pygame interface to be terminated
+                pygame.quit()
+        self.draw()
+
+# Run the search in a SearchThread and replay what it queues onto the spots from this (the pygame) thread
+def watch_search(draw, grid, search, policy):
+    search.start()
+    while True:
+        finished = not search.is_alive() # Checked before draining so nothing queued at the very end is missed
+        for kind, pos in search.observer.drain():
+            if kind == OPENED:
+                grid[pos[0]][pos[1]].make_open()
+            elif kind == CLOSED:
+                grid[pos[0]][pos[1]].make_closed()
+            elif policy.step():
+                draw()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: # Stop the search as well as the interface
+                search.cancel()
+                search.join()
+                pygame.event.post(event) # Put the quit back so main() closes the window
+                return None
+        if finished:
+            return search.result
+        pygame.time.wait(1) # Leave the search thread some time to run
+
+# Main Astar algorithm here; the search itself lives in solver.solve(), this only visualises it
+# policy is a FramePolicy choosing which expansions are drawn; threaded runs the search in a worker thread
+# state is an optional SearchState kept between runs on the same board, so each run does not allocate a new one
+def algorithm(draw, grid, start, end, portals_pink, portals_purple, policy=None, threaded=False, state=None):
+    policy = policy or FramePolicy()
+    # The solver works on a compact copy of the grid; portal groups are read from the spot colours
+    grid_map = GridMap.from_spots(grid)
+    if threaded:
+        result = watch_search(draw, grid, SearchThread(grid_map, start.get_pos(), end.get_pos(), state=state), policy)
+    else:
+        result = solve(grid_map, start.get_pos(), end.get_pos(), observer=SpotObserver(draw, grid, policy), state=state)
+
+    # No result at all means the window was closed and the search cancelled, which says nothing about whether there is a path
+    if result is None:
+        return None
+
+    # Solution is found if a path comes back
+    if result.found:
+        # With final_only nothing is shown until the whole path is in place
+        reconstruct_path(result.path[:-1], grid, (lambda: None) if policy.final_only else draw)
+        print("Total number of steps needed = ", result.cost)
+        # Repaint the colours of start, end and portals for better visualisation
+        end.make_end()
+        start.make_start()
+        for portal in portals_pink:
+            portal.make_portal_pink()
+        for portal in portals_purple:
+            portal.make_portal_purple()
         draw()
-
-        if current != start:
-            current.make_closed() # Close off already-considered nodes
+        return True
 
     #return False
     print("------------------------")
     print("There is no solution!!!!")
     pygame.quit()
 
-# Calculate the grid spacing and add spot instances to each grid point
-def make_grid(rows, width):
+# Calculate the grid spacing and add spot instances to each grid point; canvas is the GridRenderer the spots paint into
+def make_grid(rows, width, canvas=None):
     grid = []
     gap = width // rows
 
     for i in range(rows):
         grid.append([])
         for j in range(rows):
-            spot = Spot(i, j, gap, rows)
+            spot = Spot(i, j, gap, rows, canvas)
             grid[i].append(spot)
 
     return grid
 
-# Draw grid lines with gray lines
-def draw_grid(win, rows, width):
-    gap = width // rows
-
-    for i in range(rows):
-        pygame.draw.line(win, GREY, (0, i * gap), (width, i * gap))
-        for j in range(rows):
-            pygame.draw.line(win, GREY, (j * gap, 0), (j * gap, width))
-
-# Paint the grid white
-def draw(win, grid, rows, width):
-    win.fill(WHITE)
-
-    for row in grid:
-        for spot in row:
-            spot.draw(win)
-
-    draw_grid(win, rows, width)
-    pygame.display.update()
+# Colour the spots after a GridMap (e.g. one loaded from a map file) the way clicking it in would have
+def paint_grid(grid, grid_map):
+    for row in range(grid_map.rows):
+        for col in range(grid_map.cols):
+            spot = grid[row][col]
+            if grid_map.is_barrier(row, col):
+                spot.make_barrier()
+                continue
+            for _ in range(grid_map.get_cost(row, col) - 1):
+                spot.add_cost()
+            if grid_map.is_portal(row, col):
+                if grid_map.portal[grid_map.index(row, col)] == PORTAL_PINK:
+                    spot.make_portal_pink()
+                else:
+                    spot.make_portal_purple()
 
 # Get the position of where the mouse click is
 def get_clicked_pos(pos, rows, width):
@@ -306,6 +292,12 @@ def main():
     else: 
         rows = int(rows)
     width = rows*15
+    print("How many nodes should be expanded between frames (press Enter for 1, 0 to only draw the final path)?")
+    every = input()
+    if every == "":
+        every = 1
+    else:
+        every = int(every)
     print("-----------------------------------------------")
     print("Instructions:")
     print("   1st left click selects the start point")
@@ -317,18 +309,21 @@ def main():
     print("   Right click to reselect blocks")
     print("   Press space bar to start game")
     print("   Press c to clear board")
+    print("   Press s to save the board to " + MAP_FILE + " and l to load it back")
     print("-----------------------------------------------")
 
     win = pygame.display.set_mode((width, width))
     pygame.display.set_caption("A* Path Finding Algorithm")
-    grid = make_grid(rows, width)
+    renderer = GridRenderer(win, rows, width)
+    grid = make_grid(rows, width, renderer)
+    state = SearchState(rows * rows) # Reused by every run of the search
 
     start = None
     end = None
 
     run = True
     while run:
-        draw(win, grid, rows, width)
+        renderer.draw()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
@@ -380,25 +375,40 @@ def main():
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE and start and end:
+                    # Neighbors (including the extra ones added by portals) are worked out inside the solver
                     portals_pink, portals_purple = check_portal(grid)
-                    for row in grid:
-                        for spot in row:
-                            # Calculate all the neighbors of each spot in the grid
-                            spot.update_neighbors(grid) 
-                    # Add additional neighbors to those adjacent to portals
-                    add_portal_neighbors(portals_pink) 
-                    add_portal_neighbors(portals_purple)       
-
-                    algorithm(lambda: draw(win, grid, rows, width), grid, start, end, portals_pink, portals_purple)
+
+                    policy = FramePolicy(every=max(every, 1), final_only=every == 0)
+                    algorithm(renderer.draw, grid, start, end, portals_pink, portals_purple, policy, threaded=True, state=state)
                 
                 # Key c to restart board
                 if event.key == pygame.K_c:
                     start = None
                     end = None
-                    grid = make_grid(rows, width)
+                    grid = make_grid(rows, width, renderer)
+
+                # Keys s and l to save the board to MAP_FILE and load it back
+                if event.key == pygame.K_s:
+                    save_map(MAP_FILE, GridMap.from_spots(grid), start and start.get_pos(), end and end.get_pos())
+                    print("Board saved to", MAP_FILE)
+                if event.key == pygame.K_l:
+                    grid_map, start_pos, end_pos = load_map(MAP_FILE)
+                    if grid_map.rows != rows or grid_map.cols != rows:
+                        print("The board in", MAP_FILE, "is", grid_map.rows, "by", grid_map.cols, "; restart with that grid spacing")
+                    else:
+                        grid = make_grid(rows, width, renderer)
+                        paint_grid(grid, grid_map)
+                        start = end = None
+                        if start_pos:
+                            start = grid[start_pos[0]][start_pos[1]]
+                            start.make_start()
+                        if end_pos:
+                            end = grid[end_pos[0]][end_pos[1]]
+                            end.make_end()
 
     #return False
     pygame.quit()
 
 # main(WIN, WIDTH)
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+@author: ChingHongFung
+Flow fields for crowds: rather than one path per agent, a single backward Dijkstra from the end gives every cell its cost to
+the end and the next cell to move to, portal jumps included. Any number of agents then read their move with one lookup.
+
+    field = FlowField(grid, end)
+    next_pos = field.next_step(row, col) # None at the end or where the end cannot be reached
+    field.direction[grid.index(row, col)] # DOWN, UP, RIGHT, LEFT, PORTAL or NO_MOVE
+
+grid may be the GridMap built from make_grid() and add_cost() (GridMap.from_spots()), a list of cost rows or a PreparedMap.
+The tables are flat arrays indexed like the grid, so numpy can wrap them without copying (numpy.frombuffer(field.distance,
+dtype=numpy.int32)) to move many agents at once. After the grid is edited, build a new field.
+"""
+
+from array import array
+
+from dijkstra import UNREACHABLE, dijkstra
+from solver import PreparedMap
+
+# Moves in the order GridMap.get_neighbors() produces them, as direction codes and (row step, col step)
+DOWN = 0
+UP = 1
+RIGHT = 2
+LEFT = 3
+PORTAL = 4 # The next cell is reached through a portal; look it up in next_cell
+NO_MOVE = -1 # The end itself, barriers and cells the end cannot be reached from
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+class FlowField:
+    def __init__(self, grid, end, portals=None):
+        if isinstance(grid, PreparedMap):
+            self.prepared = grid
+        else:
+            self.prepared = PreparedMap(grid, portals)
+        grid = self.grid = self.prepared.grid
+        self.end = grid.index(*end)
+        size = len(grid)
+        self.next_cell = array("i", [-1]) * size # Next cell on a cheapest path to the end, -1 for none
+        self.distance = array("i", [UNREACHABLE]) * size # Cost from each cell to the end, UNREACHABLE if it cannot get there
+        if grid.passable[self.end]:
+            self.distance = dijkstra(grid, self.prepared.portal_table, self.end, reverse=True, came_from=self.next_cell)
+        self.direction = self.directions()
+
+    # Turn next_cell into direction codes; the index difference gives the move, except across the edge of a row
+    def directions(self):
+        cols, next_cell = self.grid.cols, self.next_cell
+        moves = {cols: DOWN, -cols: UP, 1: RIGHT, -1: LEFT}
+        direction = array("b", [NO_MOVE]) * len(next_cell)
+        for index, target in enumerate(next_cell):
+            if target < 0:
+                continue
+            move = moves.get(target - index, PORTAL)
+            if move == RIGHT and target % cols == 0 or move == LEFT and index % cols == 0:
+                move = PORTAL
+            direction[index] = move
+        return direction
+
+    # Cost from (row, col) to the end, None if the end cannot be reached from there
+    def cost_to_end(self, row, col):
+        distance = self.distance[self.grid.index(row, col)]
+        return None if distance == UNREACHABLE else distance
+
+    # (row, col) an agent at (row, col) should move to next, None at the end or where the end cannot be reached
+    def next_step(self, row, col):
+        target = self.next_cell[self.grid.index(row, col)]
+        return None if target < 0 else self.grid.get_pos(target)
+
+    # Next (row, col) for every agent position given, in the same order
+    def next_steps(self, positions):
+        next_cell, cols = self.next_cell, self.grid.cols
+        return [None if next_cell[row * cols + col] < 0 else divmod(next_cell[row * cols + col], cols) for row, col in positions]
+
+    # Full path from (row, col) to the end following the field, None if the end cannot be reached
+    def path_from(self, row, col):
+        index = self.grid.index(row, col)
+        if self.distance[index] == UNREACHABLE:
+            return None
+        path = [index]
+        while index != self.end:
+            index = self.next_cell[index]
+            path.append(index)
+        return [self.grid.get_pos(index) for index in path]
@@ -0,0 +1,93 @@
+"""
+@author: ChingHongFung
+When to draw while a search is being visualised. algorithm() used to redraw after every expansion, so the time a search took
+on screen was almost all drawing. A FramePolicy decides which steps get a frame:
+
+    FramePolicy()               every expansion, as before
+    FramePolicy(every=50)       every 50 expansions
+    FramePolicy(fps=60)         at most 60 frames a second, however fast the search runs
+    FramePolicy(final_only=True) nothing until the path has been found
+
+The search can also run in a worker thread (SearchThread). Its observer only queues what happened (SearchEvents) and the
+pygame loop on the main thread takes the events off the queue, colours the spots and draws whenever the policy says so.
+pygame is only ever called from the main thread. Nothing here imports pygame.
+"""
+
+import threading
+import time
+from collections import deque
+
+from solver import SearchObserver, solve
+
+# Kinds of queued search events
+OPENED = 0
+CLOSED = 1
+STEPPED = 2
+
+class FramePolicy:
+    def __init__(self, every=1, fps=None, final_only=False):
+        self.every = every
+        self.interval = 1.0 / fps if fps else 0.0
+        self.final_only = final_only
+        self.steps = 0
+        self.last_frame = 0.0
+
+    # Count one expansion; True when a frame should be drawn for it
+    def step(self):
+        if self.final_only:
+            return False
+        self.steps += 1
+        if self.steps % self.every:
+            return False
+        if self.interval:
+            now = time.perf_counter()
+            if now - self.last_frame < self.interval:
+                return False
+            self.last_frame = now
+        return True
+
+# Raised inside the search to stop it when the window is closed
+class SearchCancelled(Exception):
+    pass
+
+# Observer for a search running in another thread: events are appended to a deque (safe to share between threads) to be
+# applied by the main thread
+class SearchEvents(SearchObserver):
+    def __init__(self):
+        self.events = deque()
+        self.cancelled = False
+
+    def on_open(self, pos):
+        self.events.append((OPENED, pos))
+
+    def on_close(self, pos):
+        self.events.append((CLOSED, pos))
+
+    def on_step(self):
+        if self.cancelled:
+            raise SearchCancelled()
+        self.events.append((STEPPED, None))
+
+    # Take everything queued so far, oldest first
+    def drain(self):
+        events = self.events
+        while events:
+            yield events.popleft()
+
+# Runs solve() with a SearchEvents observer; result is set once the thread has finished (None if it was cancelled)
+class SearchThread(threading.Thread):
+    def __init__(self, grid, start, end, **options):
+        super().__init__(daemon=True)
+        self.observer = SearchEvents()
+        self.arguments = (grid, start, end)
+        self.options = options
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = solve(*self.arguments, observer=self.observer, **self.options)
+        except SearchCancelled:
+            pass
+
+    def cancel(self):
+        self.observer.cancelled = True
@@ -0,0 +1,194 @@
+"""
+@author: ChingHongFung
+Seeded map generators for benchmarks and fuzzing. Each one builds a GridMap and fills its buffers through NumPy views
+(no copy), with whole rows, walls or noise layers handled per NumPy call rather than per cell, so 10000 x 10000 maps take
+seconds. The same seed always gives the same map.
+
+    grid = random_obstacles(10000, density=0.3, seed=1)
+    grid = recursive_division_maze(2001, seed=7)
+    grid = cost_terrain(4096, scale=64, seed=3)
+    grid = rooms_and_corridors(1000, seed=5)
+    add_portals(grid, count=500, groups=2, seed=9)
+"""
+
+import numpy
+
+from grid_map import MAX_COST, GridMap
+
+# Rows of noise worked out at a time, so the float layers of a huge map never have to be held all at once
+NOISE_BAND = 256
+
+# Most maze chambers split in one round of NumPy calls
+MAZE_BATCH = 1 << 18
+
+# Each cell is a barrier with probability density
+def random_obstacles(rows, cols=None, density=0.25, seed=0):
+    grid = GridMap(rows, cols)
+    passable, _, _ = grid.arrays()
+    rng = numpy.random.default_rng(seed)
+    for first in range(0, grid.rows, NOISE_BAND):
+        band = passable[first:first + NOISE_BAND]
+        band[:] = rng.random(band.shape, dtype=numpy.float32) >= density
+    return grid
+
+# Maze made by recursive division: a chamber is split by a wall with one gap in it, and both halves are split again until
+# they are one cell across. Walls sit on even rows/cols and passages on odd ones. All the chambers of one level of the
+# recursion are split together, so there is one round of NumPy calls per level rather than one per chamber
+def recursive_division_maze(rows, cols=None, seed=0):
+    grid = GridMap(rows, cols)
+    rows, cols = grid.rows, grid.cols
+    passable, _, _ = grid.arrays()
+    flat = passable.reshape(-1)
+    rng = numpy.random.default_rng(seed)
+    # Outer wall (an even number of rows or cols leaves the last one as wall too)
+    passable[:] = 0
+    last_row, last_col = (rows - 2) | 1, (cols - 2) | 1
+    if last_row >= rows - 1:
+        last_row -= 2
+    if last_col >= cols - 1:
+        last_col -= 2
+    if last_row < 1 or last_col < 1:
+        return grid
+    passable[1:last_row + 1, 1:last_col + 1] = 1
+
+    # Chambers as arrays of first/last open row and col (all odd), taken a batch at a time so memory stays bounded
+    pending = [tuple(numpy.array([value], dtype=numpy.int64) for value in (1, last_row, 1, last_col))]
+    while pending:
+        top, bottom, left, right = pending.pop()
+        row_walls, col_walls = (bottom - top) // 2, (right - left) // 2 # Number of places a wall could go
+        # A chamber one passage wide is finished
+        keep = (row_walls > 0) & (col_walls > 0)
+        top, bottom, left, right = top[keep], bottom[keep], left[keep], right[keep]
+        row_walls, col_walls = row_walls[keep], col_walls[keep]
+        count = len(top)
+        if not count:
+            continue
+        # Split across the longer side, either way when it is square
+        across = (row_walls > col_walls) | ((row_walls == col_walls) & (rng.random(count, dtype=numpy.float32) < 0.5))
+        h, v = across, ~across
+
+        # Horizontal walls: a row between top and bottom, open again at one odd col
+        wall_row = top[h] + 1 + 2 * random_below(rng, row_walls[h])
+        gap_col = left[h] + 2 * random_below(rng, (right[h] - left[h]) // 2 + 1)
+        flat[segment_cells(wall_row * cols + left[h], right[h] - left[h] + 1, 1)] = 0
+        flat[wall_row * cols + gap_col] = 1
+        # Vertical walls: the same with rows and cols swapped
+        wall_col = left[v] + 1 + 2 * random_below(rng, col_walls[v])
+        gap_row = top[v] + 2 * random_below(rng, (bottom[v] - top[v]) // 2 + 1)
+        flat[segment_cells(top[v] * cols + wall_col, bottom[v] - top[v] + 1, cols)] = 0
+        flat[gap_row * cols + wall_col] = 1
+
+        # Each chamber becomes the two on either side of its wall
+        children = (numpy.concatenate((top[h], wall_row + 1, top[v], top[v])),
+                    numpy.concatenate((wall_row - 1, bottom[h], bottom[v], bottom[v])),
+                    numpy.concatenate((left[h], left[h], left[v], wall_col + 1)),
+                    numpy.concatenate((right[h], right[h], wall_col - 1, right[v])))
+        for first in range(0, len(children[0]), MAZE_BATCH):
+            pending.append(tuple(side[first:first + MAZE_BATCH] for side in children))
+    return grid
+
+# Random integers 0 <= n < limits[i], one per entry of limits
+def random_below(rng, limits):
+    return (rng.random(len(limits)) * limits).astype(numpy.int64)
+
+# Flat indices of many straight segments at once: segment i starts at starts[i] and has lengths[i] cells step apart
+def segment_cells(starts, lengths, step):
+    if not len(starts):
+        return numpy.zeros(0, dtype=numpy.int64)
+    ends = numpy.cumsum(lengths)
+    offsets = numpy.arange(ends[-1]) - numpy.repeat(ends - lengths, lengths)
+    return numpy.repeat(starts, lengths) + offsets * step
+
+# Smooth cost terrain from Perlin (gradient) noise, mapped onto the 1 to MAX_COST range add_cost() produces. scale is the
+# size in cells of the coarsest features; each further octave halves it. Cells whose noise reaches barrier_level (0 to 1)
+# become barriers, like a block costed past MAX_COST
+def cost_terrain(rows, cols=None, scale=32, octaves=4, seed=0, barrier_level=None):
+    grid = GridMap(rows, cols)
+    passable, cost, _ = grid.arrays()
+    rng = numpy.random.default_rng(seed)
+    layers = []
+    for octave in range(octaves):
+        cell = max(1.0, scale / 2 ** octave)
+        lattice_rows, lattice_cols = int(grid.rows / cell) + 2, int(grid.cols / cell) + 2
+        angles = rng.random((lattice_rows, lattice_cols)) * 2 * numpy.pi
+        layers.append((cell, numpy.cos(angles).astype(numpy.float32), numpy.sin(angles).astype(numpy.float32)))
+    # Sum of the octave amplitudes, to bring the noise back to roughly -1..1
+    amplitude = sum(0.5 ** octave for octave in range(octaves))
+    col_index = numpy.arange(grid.cols, dtype=numpy.float32)
+    for first in range(0, grid.rows, NOISE_BAND):
+        row_index = numpy.arange(first, min(grid.rows, first + NOISE_BAND), dtype=numpy.float32)
+        noise = numpy.zeros((len(row_index), grid.cols), dtype=numpy.float32)
+        for octave, (cell, gradient_x, gradient_y) in enumerate(layers):
+            noise += perlin(row_index / cell, col_index / cell, gradient_x, gradient_y) * 0.5 ** octave
+        # The summed noise almost never leaves +-0.35; stretch that to 0..1 so all costs turn up
+        level = numpy.clip(noise / amplitude / 0.7 + 0.5, 0, 1)
+        cost[first:first + len(row_index)] = 1 + numpy.minimum(level * MAX_COST, MAX_COST - 1).astype(numpy.uint8)
+        if barrier_level is not None:
+            passable[first:first + len(row_index)] = level < barrier_level
+    return grid
+
+# Gradient noise on the grid of points (y, x) for the lattice gradients given. y is increasing, so a band of rows only
+# touches a few lattice rows: each lattice row's contribution along x is worked out once for all cols, and every row of
+# the band is then a blend of two of them (whole row operations instead of a 2D gather per corner)
+def perlin(y, x, gradient_x, gradient_y):
+    dy, dx = (y - numpy.floor(y))[:, None], x - numpy.floor(x)
+    y0, x0 = numpy.floor(y).astype(numpy.int64), numpy.floor(x).astype(numpy.int64)
+    fade_y, fade_x = dy * dy * dy * (dy * (dy * 6 - 15) + 10), dx * dx * dx * (dx * (dx * 6 - 15) + 10)
+    lattice = slice(y0[0], y0[-1] + 2)
+    left_x, right_x = gradient_x[lattice, x0] * dx, gradient_x[lattice, x0 + 1] * (dx - 1)
+    left_y, right_y = gradient_y[lattice, x0], gradient_y[lattice, x0 + 1]
+    along = left_x + fade_x * (right_x - left_x) # x part of the dot products, per lattice row
+    across = left_y + fade_x * (right_y - left_y) # y gradient, to be multiplied by the row offset
+    above = y0 - y0[0]
+    top = along[above] + across[above] * dy
+    bottom = along[above + 1] + across[above + 1] * (dy - 1)
+    return top + fade_y * (bottom - top)
+
+# Rectangular rooms joined by L-shaped one cell wide corridors; everything else is barrier. Rooms are taken in bands of
+# rows, alternately left to right and right to left, and each is joined to the next, so corridors stay short. Every row of
+# every room and every corridor leg is one segment, all carved with a single NumPy assignment
+def rooms_and_corridors(rows, cols=None, rooms=None, room_size=(4, 12), seed=0):
+    grid = GridMap(rows, cols)
+    rows, cols = grid.rows, grid.cols
+    passable, _, _ = grid.arrays()
+    flat = passable.reshape(-1)
+    rng = numpy.random.default_rng(seed)
+    passable[:] = 0
+    smallest, largest = room_size
+    if rooms is None:
+        rooms = max(1, rows * cols // ((smallest + largest) ** 2))
+    heights = rng.integers(smallest, largest + 1, rooms).clip(1, rows)
+    widths = rng.integers(smallest, largest + 1, rooms).clip(1, cols)
+    tops = (rng.random(rooms) * (rows - heights + 1)).astype(numpy.int64)
+    lefts = (rng.random(rooms) * (cols - widths + 1)).astype(numpy.int64)
+    room_rows = numpy.repeat(tops, heights) + segment_cells(numpy.zeros(rooms, dtype=numpy.int64), heights, 1)
+    flat[segment_cells(room_rows * cols + numpy.repeat(lefts, heights), numpy.repeat(widths, heights), 1)] = 1
+
+    centre_rows, centre_cols = tops + heights // 2, lefts + widths // 2
+    band = centre_rows // (2 * largest)
+    order = numpy.lexsort((numpy.where(band % 2, -centre_cols, centre_cols), band))
+    centre_rows, centre_cols = centre_rows[order], centre_cols[order]
+    row_a, col_a, row_b, col_b = centre_rows[:-1], centre_cols[:-1], centre_rows[1:], centre_cols[1:]
+    # Along row_a from col_a to col_b, then down or up col_b to row_b
+    first_col = numpy.minimum(col_a, col_b)
+    flat[segment_cells(row_a * cols + first_col, numpy.abs(col_b - col_a) + 1, 1)] = 1
+    first_row = numpy.minimum(row_a, row_b)
+    flat[segment_cells(first_row * cols + col_b, numpy.abs(row_b - row_a) + 1, cols)] = 1
+    return grid
+
+# Turn count random passable cells of grid into portals spread over groups portal groups (dense networks included)
+def add_portals(grid, count, groups=2, seed=0):
+    passable, _, portal = grid.arrays()
+    passable, portal = passable.reshape(-1), portal.reshape(-1)
+    rng = numpy.random.default_rng(seed)
+    chosen = numpy.zeros(0, dtype=numpy.int64)
+    # Draw more cells than needed and keep the passable ones; the grid may be mostly barrier, so retry a few times
+    for _ in range(8):
+        cells = rng.integers(0, len(passable), 2 * (count - len(chosen)) + 16)
+        chosen = numpy.unique(numpy.concatenate((chosen, cells[passable[cells] == 1])))
+        if len(chosen) >= count:
+            break
+    chosen = rng.permutation(chosen)[:count]
+    portal[chosen] = rng.integers(0, groups, len(chosen))
+    grid.version += 1
+    return grid
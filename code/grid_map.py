@@ -0,0 +1,180 @@
+"""
+@author: ChingHongFung
+Compact grid model for the headless solver. Instead of one Spot object per cell, the map is held in flat buffers indexed by
+row * cols + col: passability, cost (same meaning as Spot.cost) and portal group (-1 for no portal). A 4096x4096 map takes
+roughly 48MB rather than several GB of Spot instances.
+
+version goes up by one on every edit made through reset(), make_barrier(), make_portal() and add_cost(), so anything
+worked out from the map (e.g. cached paths, see path_cache.py) can tell when it is out of date. Writes straight into the
+buffers do not change it.
+"""
+
+import re
+from array import array
+
+# Matches a byte of the portal buffer that is not -1
+NOT_PORTAL_FREE = re.compile(rb"[^\xff]")
+NO_PORTALS = b"\xff" * 65536
+
+# Portal group numbers used for the two portal types in final_version.py
+PORTAL_PINK = 0
+PORTAL_PURPLE = 1
+
+# Once a block's cost goes over this it is turned into a barrier, as in Spot.add_cost()
+MAX_COST = 13
+
+# Highest portal group number a cell of the (signed byte) portal buffer can hold
+MAX_GROUP = 127
+
+class GridMap:
+    def __init__(self, rows, cols=None):
+        if cols is None:
+            cols = rows
+        self.rows = rows
+        self.cols = cols
+        size = rows * cols
+        self.passable = bytearray(b"\x01") * size
+        self.cost = array("B", [1]) * size
+        self.portal = array("b", [-1]) * size
+        self.version = 0
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def get_pos(self, index):
+        return divmod(index, self.cols)
+
+    def get_cost(self, row, col):
+        return self.cost[row * self.cols + col]
+
+    def is_barrier(self, row, col):
+        return not self.passable[row * self.cols + col]
+
+    def is_portal(self, row, col):
+        return self.portal[row * self.cols + col] >= 0
+
+    def reset(self, row, col):
+        index = row * self.cols + col
+        self.passable[index] = 1
+        self.cost[index] = 1
+        self.portal[index] = -1
+        self.version += 1
+
+    def make_barrier(self, row, col):
+        index = row * self.cols + col
+        self.passable[index] = 0
+        self.portal[index] = -1
+        self.version += 1
+
+    # Like Spot.make_portal_pink(), a portal placed on a barrier replaces it
+    def make_portal(self, row, col, group):
+        if not 0 <= group <= MAX_GROUP:
+            raise ValueError("Portal group must be between 0 and %d, not %r" % (MAX_GROUP, group))
+        index = row * self.cols + col
+        self.passable[index] = 1
+        self.portal[index] = group
+        self.version += 1
+
+    # Add cost to a block; a block that has been costed more than MAX_COST times becomes a barrier
+    def add_cost(self, row, col):
+        index = row * self.cols + col
+        if self.passable[index]:
+            self.cost[index] += 1
+            if self.cost[index] > MAX_COST:
+                self.passable[index] = 0
+            self.version += 1
+
+    # Group the portal cells by portal type; returns a list (one entry per group) of cell indices
+    # 2D NumPy views (rows x cols) of the passable, cost and portal buffers; writing into them writes into the grid but, like
+    # any write straight into the buffers, does not change version. NumPy is imported here so the front end never needs it
+    def arrays(self):
+        import numpy
+        shape = (self.rows, self.cols)
+        return (numpy.frombuffer(self.passable, dtype=numpy.uint8).reshape(shape),
+                numpy.frombuffer(self.cost, dtype=numpy.uint8).reshape(shape),
+                numpy.frombuffer(self.portal, dtype=numpy.int8).reshape(shape))
+
+    def portal_groups(self):
+        groups = []
+        portal = self.portal
+        cells = memoryview(portal).cast("B")
+        # Scan for anything other than -1 (0xff) at C speed rather than looping over every cell in Python; blocks with no
+        # portal at all (most of a large map) are skipped with a single comparison
+        for first in range(0, len(cells), len(NO_PORTALS)):
+            block = cells[first:first + len(NO_PORTALS)]
+            if block.tobytes() == NO_PORTALS[:len(block)]:
+                continue
+            for match in NOT_PORTAL_FREE.finditer(block):
+                index = first + match.start()
+                group = portal[index]
+                while len(groups) <= group:
+                    groups.append([])
+                groups[group].append(index)
+        return groups
+
+    # Same idea as Spot.update_neighbors() but worked out on demand for a single cell straight from the passability buffer,
+    # so nothing has to be prepared for cells the search never reaches
+    def get_neighbors(self, index):
+        cols, passable = self.cols, self.passable
+        row, col = divmod(index, cols)
+        result = []
+        if row < self.rows - 1 and passable[index + cols]: # DOWN
+            result.append(index + cols)
+        if row > 0 and passable[index - cols]: # UP
+            result.append(index - cols)
+        if col < cols - 1 and passable[index + 1]: # RIGHT
+            result.append(index + 1)
+        if col > 0 and passable[index - 1]: # LEFT
+            result.append(index - 1)
+        return result
+
+    # Wrap existing buffers (e.g. shared memory or a memory-mapped file) without copying them. Each buffer must hold
+    # rows * cols single byte entries in the layout described at the top of this file
+    @classmethod
+    def from_buffers(cls, rows, cols, passable, cost, portal):
+        grid = cls.__new__(cls)
+        grid.rows = rows
+        grid.cols = cols
+        grid.passable = memoryview(passable).cast("B")
+        grid.cost = memoryview(cost).cast("B")
+        grid.portal = memoryview(portal).cast("b")
+        grid.version = 0
+        return grid
+
+    # Build a map from a list of rows of cell costs, 0 marking a barrier
+    @classmethod
+    def from_costs(cls, costs):
+        rows = len(costs)
+        cols = len(costs[0]) if rows else 0
+        grid = cls(rows, cols)
+        for row in range(rows):
+            for col in range(cols):
+                cost = costs[row][col]
+                if cost:
+                    grid.cost[row * cols + col] = cost
+                else:
+                    grid.make_barrier(row, col)
+        return grid
+
+    # Build a map from the Spot grid used by the pygame front end; spots only need is_barrier(), is_portal_pink(),
+    # is_portal_purple() and a cost attribute so pygame is not imported here
+    @classmethod
+    def from_spots(cls, spots):
+        rows = len(spots)
+        cols = len(spots[0]) if rows else 0
+        grid = cls(rows, cols)
+        for row in range(rows):
+            for col in range(cols):
+                spot = spots[row][col]
+                if spot.is_barrier():
+                    grid.make_barrier(row, col)
+                    continue
+                grid.cost[row * cols + col] = spot.cost
+                if spot.is_portal_pink():
+                    grid.make_portal(row, col, PORTAL_PINK)
+                elif spot.is_portal_purple():
+                    grid.make_portal(row, col, PORTAL_PURPLE)
+        return grid
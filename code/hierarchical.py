@@ -0,0 +1,416 @@
+"""
+@author: ChingHongFung
+Hierarchical pathfinding (HPA*) for maps far bigger than the 50 row grid main() draws. The grid is cut into square clusters.
+Where two neighbouring clusters touch through open cells, one or two pairs of cells on the border become entrance nodes of
+an abstract graph; inside each cluster the entrances (and every cell bordering a portal) are linked with the exact cost of
+the cheapest path that stays in the cluster. Portal edges link their cells across clusters directly.
+
+A query only has to link its start and end to the entrances of their own clusters, search the small abstract graph and then
+fill in the cells of each abstract edge with a search inside one cluster. Building the abstract graph is the expensive part
+and is done once per map; paths are close to optimal rather than guaranteed optimal, as usual for HPA*.
+
+The build needs NumPy. Entrances come from array operations over all borders at once, and the in-cluster costs from
+row/col sweeps over stacks of cluster tiles (link_clusters()) rather than a Dijkstra per node. The graph lives in flat
+arrays: a cost matrix per cluster plus a table of border crossings. With the default cluster_size of 16, on
+random_obstacles() maps at density 0.25 (one core):
+
+    map            build    peak memory    abstract nodes
+    1024 x 1024    0.6 s
+    4096 x 4096    9 s      300 MB         1.1 million
+    10000 x 10000  57 s     1.6 GB         6.5 million
+
+Queries spanning up to a few hundred cells take 1-15 ms. Routes across the whole map still search the abstract graph in
+Python and take 1-4 s on 4096 x 4096 and 1-18 s on 10000 x 10000 (50 thousand to 650 thousand abstract nodes expanded), so
+the hierarchy does not give millisecond queries for map-wide routes at that scale.
+
+    hierarchy = HierarchicalMap(grid, cluster_size=32)
+    result = hierarchy.solve((0, 0), (9000, 9500))
+"""
+
+import heapq
+from array import array
+
+import numpy
+
+from dijkstra import UNREACHABLE
+from open_list import make_open_list
+from portal_index import PortalIndex
+from solver import PreparedMap, SearchResult, SearchStats
+
+# How an abstract edge is turned back into cells
+STEP = 0 # The two cells are next to each other (or linked by a portal)
+LOCAL = 1 # A path inside one cluster
+
+# Runs of open border longer than this get an entrance at each end instead of one in the middle
+LONG_ENTRANCE = 6
+
+# Distance of a cell not reached (yet) while linking clusters; small enough that adding a cost to it cannot overflow 16 bits
+FAR = 0x7fff
+
+# Most distance entries (cells x clusters x abstract nodes) worked on at once while linking clusters
+BATCH_CELLS = 1 << 22
+
+class HierarchicalMap:
+    def __init__(self, grid, cluster_size=16, portals=None):
+        if isinstance(grid, PreparedMap):
+            self.prepared = grid
+        else:
+            self.prepared = PreparedMap(grid, portals)
+        self.grid = self.prepared.grid
+        self.portal_table = self.prepared.portal_table
+        self.cluster_size = cluster_size
+        if cluster_size * cluster_size * 13 >= FAR:
+            raise ValueError("cluster_size %d is too large, the most is %d" % (cluster_size, int((FAR / 13) ** 0.5)))
+        self.cluster_rows = -(-self.grid.rows // cluster_size)
+        self.cluster_cols = -(-self.grid.cols // cluster_size)
+        self.local_paths = {} # (a, b) -> cells from a to b inside their cluster, filled in as queries need them
+
+        # The abstract graph is held in flat arrays. Nodes are numbered cluster by cluster: the nodes of cluster c are
+        # cluster_offsets[c] up to cluster_offsets[c + 1] and node_cells gives their cells. In-cluster edges form one
+        # k x k matrix of costs per cluster of k nodes, starting at matrix_offsets[c] in local_costs (FAR where there is no
+        # path). Entrance pairs, the edges that cross a border, are step_targets/step_costs[step_offsets[n]:step_offsets[n + 1]]
+        passable, cost, _ = self.grid.arrays()
+        first, second = self.entrances(passable)
+        cells = numpy.unique(numpy.concatenate((first, second, numpy.fromiter(
+            self.portal_table.groups_of, dtype=numpy.int64, count=len(self.portal_table.groups_of)))))
+        clusters = self.clusters_of(cells)
+        order = numpy.argsort(clusters, kind="stable")
+        node_cells = cells[order]
+        node_of_cell = numpy.empty_like(order)
+        node_of_cell[order] = numpy.arange(len(order))
+        counts = numpy.bincount(clusters, minlength=self.cluster_rows * self.cluster_cols)
+        offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+        matrix_offsets = numpy.concatenate(([0], numpy.cumsum(counts * counts)))
+        local_costs = numpy.full(int(matrix_offsets[-1]), FAR, dtype=numpy.uint16)
+        self.link_clusters(passable, cost, node_cells, counts, offsets, matrix_offsets, local_costs)
+
+        # Entrance pairs step across the border, each way paying for the cell entered
+        first_node = node_of_cell[numpy.searchsorted(cells, first)]
+        second_node = node_of_cell[numpy.searchsorted(cells, second)]
+        flat_cost = cost.reshape(-1)
+        sources = numpy.concatenate((first_node, second_node))
+        order = numpy.argsort(sources, kind="stable")
+        step_targets = numpy.concatenate((second_node, first_node))[order]
+        step_costs = numpy.concatenate((flat_cost[second], flat_cost[first]))[order]
+
+        self.node_cells = to_array("q", node_cells)
+        self.cluster_offsets = to_array("q", offsets)
+        self.matrix_offsets = to_array("q", matrix_offsets)
+        self.local_costs = to_array("H", local_costs)
+        self.step_offsets = to_array("q", numpy.concatenate(([0], numpy.cumsum(numpy.bincount(sources,
+                                                                                      minlength=len(node_cells))))))
+        self.step_targets = to_array("i", step_targets)
+        self.step_costs = to_array("i", step_costs)
+
+        # Part of the heuristic that does not depend on the end: distance from each abstract node to the nearest portal,
+        # worked out the first time a query needs it
+        self.portal_cells = PortalIndex(self.grid, list(self.portal_table.groups_of))
+        self.portal_distance = {}
+
+    def __len__(self):
+        return len(self.node_cells)
+
+    # Number of abstract edges: entrance pairs both ways and every in-cluster pair joined by a path
+    def edge_count(self):
+        return len(self.step_targets) + sum(1 for cost in self.local_costs if cost < FAR) - len(self.node_cells)
+
+    def cluster_of(self, index):
+        row, col = divmod(index, self.grid.cols)
+        return row // self.cluster_size * self.cluster_cols + col // self.cluster_size
+
+    def clusters_of(self, cells):
+        rows, cols = numpy.divmod(cells, self.grid.cols)
+        return rows // self.cluster_size * self.cluster_cols + cols // self.cluster_size
+
+    # Rows and cols covered by a cluster as (first row, end row, first col, end col)
+    def bounds(self, cluster):
+        size = self.cluster_size
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        return (cluster_row * size, min(self.grid.rows, (cluster_row + 1) * size),
+                cluster_col * size, min(self.grid.cols, (cluster_col + 1) * size))
+
+    def nodes_in(self, cluster):
+        return range(self.cluster_offsets[cluster], self.cluster_offsets[cluster + 1])
+
+    # Abstract node of a cell, None if the cell is not one
+    def node_of(self, index):
+        for node in self.nodes_in(self.cluster_of(index)):
+            if self.node_cells[node] == index:
+                return node
+        return None
+
+    # (node, cost, STEP or LOCAL) for every abstract edge leaving node
+    def edges_of(self, node):
+        first, end = self.step_offsets[node], self.step_offsets[node + 1]
+        edges = [(target, cost, STEP) for target, cost in zip(self.step_targets[first:end], self.step_costs[first:end])]
+        cluster = self.cluster_of(self.node_cells[node])
+        first_node, end_node = self.cluster_offsets[cluster], self.cluster_offsets[cluster + 1]
+        count = end_node - first_node
+        row = self.matrix_offsets[cluster] + (node - first_node) * count
+        for target, cost in zip(range(first_node, end_node), self.local_costs[row:row + count]):
+            if cost < FAR and target != node:
+                edges.append((target, cost, LOCAL))
+        return edges
+
+    # The open stretches of every border between two clusters get entrance pairs: one in the middle of a short stretch, one
+    # at each end of a long one. Returns the cells on either side of the chosen pairs, both as arrays of cell indices
+    def entrances(self, passable):
+        size, cols = self.cluster_size, self.grid.cols
+        passable = passable.astype(bool)
+        # Borders between a cluster and the one below it, then between a cluster and the one to its right
+        border_rows = numpy.arange(size - 1, self.grid.rows - 1, size)
+        line, position = entrance_runs(passable[border_rows] & passable[border_rows + 1], size)
+        above = border_rows[line] * cols + position
+        border_cols = numpy.arange(size - 1, cols - 1, size)
+        line, position = entrance_runs((passable[:, border_cols] & passable[:, border_cols + 1]).T, size)
+        left = position * cols + border_cols[line]
+        return numpy.concatenate((above, left)), numpy.concatenate((above + cols, left + 1))
+
+    # Fill local_costs with the cost of the cheapest path staying inside the cluster between every pair of abstract nodes
+    # of a cluster. Clusters holding about the same number of nodes are done together: their tiles are stacked into one
+    # array with a distance layer per node, and sweeps over the rows and cols of all of them at once (relax_tiles()) take
+    # the place of one Dijkstra per node
+    def link_clusters(self, passable, cost, node_cells, counts, offsets, matrix_offsets, local_costs):
+        size = self.cluster_size
+        padded_rows, padded_cols = self.cluster_rows * size, self.cluster_cols * size
+        # Cost of entering each cell, FAR for barriers and for the padding that squares off the last clusters
+        entering = numpy.full((padded_rows, padded_cols), FAR, dtype=numpy.uint16)
+        inside = entering[:self.grid.rows, :self.grid.cols]
+        inside[:] = cost
+        inside[passable == 0] = FAR
+        tiles = entering.reshape(self.cluster_rows, size, self.cluster_cols, size)
+        node_rows, node_cols = numpy.divmod(node_cells, self.grid.cols)
+        node_rows, node_cols = node_rows % size, node_cols % size
+
+        order = numpy.argsort(-counts, kind="stable")
+        order = order[counts[order] > 1]
+        done = 0
+        while done < len(order):
+            nodes = int(counts[order[done]])
+            batch = order[done:done + max(1, BATCH_CELLS // (size * size * nodes))]
+            done += len(batch)
+            # Slot k of cluster b holds its k-th node, if it has that many
+            slots = numpy.arange(nodes)
+            batch_counts = counts[batch]
+            real = slots[None, :] < batch_counts[:, None]
+            node = numpy.minimum(offsets[batch][:, None] + slots[None, :], len(node_cells) - 1)
+            row, col = node_rows[node], node_cols[node]
+
+            # Distances laid out as (row, col, node, cluster): every slice a sweep takes is contiguous, and the entering
+            # costs, the same for every node, are repeated along an axis that is not the innermost one
+            distance = numpy.full((size, size, nodes, len(batch)), FAR, dtype=numpy.uint16)
+            cluster_index = numpy.broadcast_to(numpy.arange(len(batch))[:, None], real.shape)
+            slot_index = numpy.broadcast_to(slots[None, :], real.shape)
+            distance[row[real], col[real], slot_index[real], cluster_index[real]] = 0
+            cluster_rows, cluster_cols = numpy.divmod(batch, self.cluster_cols)
+            relax_tiles(distance, tiles[cluster_rows, :, cluster_cols, :].transpose(1, 2, 0)[:, :, None].copy())
+
+            # found[b, k, j]: cost from node k to node j of cluster b, stored at row k, col j of the cluster's matrix
+            found = distance[row[:, None, :], col[:, None, :], slots[None, :, None],
+                             numpy.arange(len(batch))[:, None, None]]
+            keep = real[:, :, None] & real[:, None, :]
+            place = (matrix_offsets[batch][:, None, None] + slots[None, :, None] * batch_counts[:, None, None] +
+                     slots[None, None, :])
+            local_costs[place[keep]] = found[keep]
+
+    # Cells from a to b (both in the same cluster) along the cheapest path inside the cluster
+    def local_path(self, a, b, cache=True):
+        path = self.local_paths.get((a, b))
+        if path is None:
+            _, came_from = cluster_dijkstra(self.grid, self.bounds(self.cluster_of(a)), a, target=b)
+            path = [b]
+            while path[-1] != a:
+                path.append(came_from[path[-1]])
+            path.reverse()
+            if cache:
+                self.local_paths[(a, b)] = path
+        return path
+
+    # Find a path between two (row, col) positions; the result's path is a list of (row, col) like solver.solve()
+    def solve(self, start, end, open_list="binary"):
+        grid = self.grid
+        start, end = grid.index(*start), grid.index(*end)
+        stats = SearchStats()
+        if not grid.passable[start] or not grid.passable[end]:
+            stats.finish()
+            return SearchResult(None, float("inf"), stats)
+
+        # For this query the start and end are two extra nodes numbered after the abstract ones, with temporary edges from
+        # the start to the abstract nodes of its cluster and from those of the end's cluster to the end
+        node_cells = self.node_cells
+        start_node, end_node = len(node_cells), len(node_cells) + 1
+        def cell_of(node):
+            if node < start_node:
+                return node_cells[node]
+            return start if node == start_node else end
+        start_cluster, end_cluster = self.cluster_of(start), self.cluster_of(end)
+        dist, _ = cluster_dijkstra(grid, self.bounds(start_cluster), start)
+        start_edges = [(node, dist[node_cells[node]], LOCAL) for node in self.nodes_in(start_cluster)
+                       if node_cells[node] in dist]
+        if end in dist:
+            start_edges.append((end_node, dist[end], LOCAL))
+        dist, _ = cluster_dijkstra(grid, self.bounds(end_cluster), end, reverse=True)
+        to_end = {node: dist[node_cells[node]] for node in self.nodes_in(end_cluster) if node_cells[node] in dist}
+
+        # Same lower bound as PortalBound, with the portal distances of abstract nodes kept between queries
+        cols = grid.cols
+        end_row, end_col = grid.get_pos(end)
+        exit_to_end = self.portal_cells.nearest(end_row, end_col) + 1
+        portal_distance = self.portal_distance
+        checked = self.portal_cells.checked # The index is kept between queries; count only this query's checks
+        def estimate(node):
+            stats.heuristic_evaluations += 1
+            row, col = divmod(cell_of(node), cols)
+            walk = abs(row - end_row) + abs(col - end_col)
+            if walk <= exit_to_end:
+                return walk
+            distance = portal_distance.get(node)
+            if distance is None:
+                distance = self.portal_cells.nearest(row, col)
+                if node < start_node:
+                    portal_distance[node] = distance
+            return min(walk, distance + exit_to_end)
+
+        portal_table, cost = self.portal_table, grid.cost
+        g_score = {start_node: 0}
+        came_from = {start_node: (None, STEP)}
+        open_set = make_open_list(open_list, end_node + 1)
+        open_set.push(start_node, estimate(start_node))
+        stats.pushed += 1
+        fired = {} # Portal groups listed so far, see PortalTable.fire()
+        while open_set:
+            current = open_set.pop()
+            stats.popped += 1
+            stats.expanded += 1
+            if current == end_node:
+                path = [grid.get_pos(index) for index in self.refine(came_from, end_node, cell_of)]
+                stats.portal_checks += self.portal_cells.checked - checked
+                stats.finish((open_set,))
+                return SearchResult(path, g_score[end_node], stats)
+
+            current_g = g_score[current]
+            if current == start_node:
+                successors = list(start_edges)
+            else:
+                successors = self.edges_of(current)
+            for neighbor in portal_table.fire(cell_of(current), current_g, fired):
+                successors.append((self.node_of(neighbor), cost[neighbor], STEP)) # Cells next to portals are all nodes
+            if current in to_end:
+                successors.append((end_node, to_end[current], LOCAL))
+
+            for neighbor, step_cost, kind in successors:
+                temp_g_score = current_g + step_cost
+                if temp_g_score < g_score.get(neighbor, float("inf")):
+                    g_score[neighbor] = temp_g_score
+                    came_from[neighbor] = (current, kind)
+                    open_set.push(neighbor, temp_g_score + estimate(neighbor))
+                    stats.relaxations += 1
+                    stats.pushed += 1
+            if len(open_set) > stats.peak_open:
+                stats.peak_open = len(open_set)
+
+        stats.portal_checks += self.portal_cells.checked - checked
+        stats.finish((open_set,))
+        return SearchResult(None, float("inf"), stats)
+
+    # Turn the abstract path ending at end into the cell indices along the way
+    def refine(self, came_from, end, cell_of):
+        hops = []
+        node = end
+        while node is not None:
+            previous, kind = came_from[node]
+            hops.append((previous, node, kind))
+            node = previous
+        hops.reverse()
+        start = hops[0][1]
+        cells = [cell_of(start)]
+        for previous, node, kind in hops[1:]:
+            if kind == LOCAL:
+                # Only paths between two permanent abstract nodes are worth keeping
+                permanent = previous != start and node != end
+                cells.extend(self.local_path(cell_of(previous), cell_of(node), cache=permanent)[1:])
+            else:
+                cells.append(cell_of(node))
+        return cells
+
+# Start (line, position) of the entrances on a stack of borders: open[i, j] is True where cell j of border i is open on both
+# sides. Runs of open cells end at cluster edges (every size cells); a run gets its middle cell, or both ends if it is longer
+# than LONG_ENTRANCE
+def entrance_runs(open_cells, size):
+    positions = numpy.arange(open_cells.shape[1])
+    before = numpy.zeros_like(open_cells)
+    before[:, 1:] = open_cells[:, :-1]
+    before[:, positions % size == 0] = False
+    after = numpy.zeros_like(open_cells)
+    after[:, :-1] = open_cells[:, 1:]
+    after[:, positions % size == size - 1] = False
+    line, first = numpy.nonzero(open_cells & ~before)
+    _, last = numpy.nonzero(open_cells & ~after)
+    length = last - first + 1
+    long_run = length > LONG_ENTRANCE
+    short = ~long_run
+    return (numpy.concatenate((line[short], line[long_run], line[long_run])),
+            numpy.concatenate((first[short] + length[short] // 2, first[long_run], last[long_run])))
+
+# Bring distance (row, col, node layer, cluster) down to the cheapest in-tile cost from each layer's source cell, where
+# entering (row, col, 1, cluster) is the cost of stepping onto each cell. Each round sweeps down, up, right and left
+# through every tile at once, so a path is settled in as many rounds as it has changes of direction (far fewer than the
+# cells it crosses); distances only go down, so an unchanged total means nothing moved and the distances are final.
+# Nothing is ever above FAR, so a distance plus a cost always fits in 16 bits
+def relax_tiles(distance, entering):
+    size = distance.shape[0]
+    step = numpy.empty_like(distance[0])
+    total = distance.sum(dtype=numpy.int64)
+    while True:
+        for layers, costs in ((distance, entering), (distance.swapaxes(0, 1), entering.swapaxes(0, 1))):
+            for line in range(1, size):
+                numpy.add(layers[line - 1], costs[line], out=step)
+                numpy.minimum(layers[line], step, out=layers[line])
+            for line in range(size - 2, -1, -1):
+                numpy.add(layers[line + 1], costs[line], out=step)
+                numpy.minimum(layers[line], step, out=layers[line])
+        previous, total = total, distance.sum(dtype=numpy.int64)
+        if total == previous:
+            return
+
+# NumPy values as an array.array, which reads back single items as plain ints far faster than a NumPy array does
+def to_array(typecode, values):
+    result = array(typecode)
+    result.frombytes(numpy.ascontiguousarray(values, dtype=numpy.dtype(typecode)).tobytes())
+    return result
+
+# Dijkstra limited to the cells inside bounds; returns the costs and came_from dicts. With reverse=True the costs are from
+# each cell to source (see dijkstra.py). Stops early once target has been settled
+def cluster_dijkstra(grid, bounds, source, reverse=False, target=None):
+    first_row, end_row, first_col, end_col = bounds
+    cols, cost, passable = grid.cols, grid.cost, grid.passable
+    dist = {source: 0}
+    came_from = {}
+    open_set = [(0, source)]
+    while open_set:
+        d, current = heapq.heappop(open_set)
+        if d > dist[current]:
+            continue
+        if current == target:
+            break
+        row, col = divmod(current, cols)
+        # Same four moves as GridMap.get_neighbors(), kept inside the cluster
+        neighbors = []
+        if row < end_row - 1:
+            neighbors.append(current + cols)
+        if row > first_row:
+            neighbors.append(current - cols)
+        if col < end_col - 1:
+            neighbors.append(current + 1)
+        if col > first_col:
+            neighbors.append(current - 1)
+        step = cost[current]
+        for neighbor in neighbors:
+            if not passable[neighbor]:
+                continue
+            temp = d + (step if reverse else cost[neighbor])
+            if temp < dist.get(neighbor, UNREACHABLE):
+                dist[neighbor] = temp
+                came_from[neighbor] = current
+                heapq.heappush(open_set, (temp, neighbor))
+    return dist, came_from
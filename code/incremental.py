@@ -0,0 +1,163 @@
+"""
+@author: ChingHongFung
+Incremental replanning with D* Lite. In main() any edit (a barrier, add_cost(), a portal toggle) meant running the whole
+search again. This planner searches backwards from the end and keeps its g/rhs values between calls; after the grid has
+been edited it is told which cells changed and only repairs the values those edits make inconsistent.
+
+    planner = IncrementalPlanner(grid, start, end)
+    result = planner.plan()
+    grid.make_barrier(4, 7)
+    planner.update([(4, 7)])
+    result = planner.plan() # only re-expands what the barrier affects
+
+The start may also move along the path with move_start(). The heuristic is the admissible portal-aware bound
+(PortalBound), so plans are optimal.
+"""
+
+from open_list import BinaryHeap
+from portal_index import PortalBound
+from solver import PreparedMap, SearchResult, SearchStats
+
+INF = float("inf")
+
+class IncrementalPlanner:
+    def __init__(self, grid, start, end, portals=None):
+        self.prepared = PreparedMap(grid, portals)
+        self.grid = self.prepared.grid
+        self.fixed_portals = portals is not None
+        self.start = self.grid.index(*start)
+        self.end = self.grid.index(*end)
+        self.g = {}
+        self.rhs = {self.end: 0}
+        self.km = 0
+        self.stats = SearchStats()
+        self.bound = PortalBound(self.grid, self.prepared.portal_table, self.start)
+        self.open_set = BinaryHeap(len(self.grid))
+        self.open_set.push(self.end, self.calculate_key(self.end))
+
+    def neighbors(self, index):
+        return self.grid.get_neighbors(index) + self.prepared.portal_table.get_neighbors(index)
+
+    def calculate_key(self, index):
+        self.stats.heuristic_evaluations += 1
+        best = min(self.g.get(index, INF), self.rhs.get(index, INF))
+        return (best + self.bound.estimate(index) + self.km, best)
+
+    # Recompute the best cost from index to the end through its neighbors and queue it if that makes it inconsistent
+    def update_vertex(self, index):
+        grid = self.grid
+        if index != self.end:
+            best = INF
+            if grid.passable[index]:
+                g, cost = self.g, grid.cost
+                for neighbor in self.neighbors(index):
+                    temp = cost[neighbor] + g.get(neighbor, INF)
+                    if temp < best:
+                        best = temp
+            self.rhs[index] = best
+        self.open_set.remove(index)
+        if self.g.get(index, INF) != self.rhs.get(index, INF):
+            self.open_set.push(index, self.calculate_key(index))
+            self.stats.pushed += 1
+
+    def compute_shortest_path(self):
+        open_set, g, rhs, stats = self.open_set, self.g, self.rhs, self.stats
+        start = self.start
+        while open_set:
+            index, old_key = open_set.peek()
+            if not (old_key < self.calculate_key(start) or rhs.get(start, INF) != g.get(start, INF)):
+                break
+            open_set.pop()
+            stats.popped += 1
+            new_key = self.calculate_key(index)
+            if old_key < new_key:
+                # Queued under a key from before an edit or a move of the start; put back rather than expanded
+                stats.stale_pops += 1
+                open_set.push(index, new_key)
+                stats.pushed += 1
+                continue
+            stats.expanded += 1
+            if g.get(index, INF) > rhs.get(index, INF):
+                g[index] = rhs[index]
+                stats.relaxations += 1
+                for neighbor in self.neighbors(index):
+                    self.update_vertex(neighbor)
+            else:
+                g[index] = INF
+                for neighbor in self.neighbors(index) + [index]:
+                    self.update_vertex(neighbor)
+            if len(open_set) > stats.peak_open:
+                stats.peak_open = len(open_set)
+
+    # Bring the plan up to date and return it as a SearchResult; stats count the work done by this call only
+    def plan(self):
+        stats = self.stats = SearchStats()
+        # The open set and the bound outlive a call, so count only what they skip and check from here on
+        stale, checked = self.open_set.stale, self.bound.entrances.checked
+        self.compute_shortest_path()
+        path = self.extract_path()
+        stats.stale_pops -= stale
+        stats.popped -= stale
+        stats.portal_checks -= checked
+        stats.finish((self.open_set,), (self.bound.entrances,))
+        return SearchResult(path, self.g.get(self.start, INF), stats)
+
+    # Follow the cheapest neighbor from the start to the end; None when the end cannot be reached
+    def extract_path(self):
+        g, cost = self.g, self.grid.cost
+        current = self.start
+        if g.get(current, INF) == INF or not self.grid.passable[current]:
+            return None
+        path = [current]
+        while current != self.end:
+            current = min(self.neighbors(current), key=lambda neighbor: cost[neighbor] + g.get(neighbor, INF))
+            path.append(current)
+        return [self.grid.get_pos(index) for index in path]
+
+    # Tell the planner which (row, col) cells were edited in the grid (barrier, cost or portal changes)
+    def update(self, changed):
+        grid = self.grid
+        changed = [grid.index(*pos) for pos in changed]
+        affected = set()
+        for index in changed:
+            affected.add(index)
+            affected.update(self.neighbors(index))
+
+        # Editing a portal, or a cell next to one, changes the portal edges of whole groups and the heuristic, so rebuild both
+        if not self.fixed_portals and any(self.touches_portal(index) for index in changed):
+            old_table = self.prepared.portal_table
+            self.prepared = PreparedMap(grid)
+            affected.update(old_table.groups_of)
+            affected.update(self.prepared.portal_table.groups_of)
+            self.bound = PortalBound(grid, self.prepared.portal_table, self.start)
+            self.requeue()
+
+        for index in affected:
+            self.update_vertex(index)
+
+    # Whether index is, was, or sits next to a portal cell
+    def touches_portal(self, index):
+        grid, portal_cells = self.grid, self.prepared.portal_cells
+        row, col = grid.get_pos(index)
+        for cell_row, cell_col in ((row, col), (row + 1, col), (row - 1, col), (row, col + 1), (row, col - 1)):
+            if 0 <= cell_row < grid.rows and 0 <= cell_col < grid.cols:
+                cell = grid.index(cell_row, cell_col)
+                if grid.portal[cell] >= 0 or cell in portal_cells:
+                    return True
+        return False
+
+    # Move the start (e.g. an agent stepping along its path) without throwing away the search
+    def move_start(self, start):
+        # Queued keys were worked out for the old start; rather than redoing them, raise every key from now on by the most
+        # the heuristic can have dropped (the bound between the old and new start)
+        start = self.grid.index(*start)
+        self.km += self.bound.estimate(start)
+        self.start = start
+        self.bound = PortalBound(self.grid, self.prepared.portal_table, start)
+
+    # Keys depend on the heuristic; work them out again after it changed
+    def requeue(self):
+        queued = list(self.open_set.keys)
+        self.open_set = BinaryHeap(len(self.grid))
+        for index in queued:
+            self.open_set.push(index, self.calculate_key(index))
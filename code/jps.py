@@ -0,0 +1,272 @@
+"""
+@author: ChingHongFung
+Jump Point Search for the 4-connected movement update_neighbors() defines. In open areas of cost 1 many shortest paths are
+just reorderings of the same moves, and plain A* expands every cell along all of them. JPS only follows canonical paths:
+a vertical run may turn sideways anywhere, but a horizontal run only turns when it is forced to (the cell diagonally
+behind is not a plain cell, so no earlier turn could have been taken instead). Runs ("jumps") are looked up rather than
+walked: where they stop does not depend on the end, so it is worked out once per map (RunTable, kept on the PreparedMap)
+and each search only checks whether its end lies on a run. Only the cells where something can change are put on the open
+set.
+
+A plain cell is passable, has cost 1 and does not border a portal. Jumps stop on anything else, and those cells are
+expanded in all directions as ordinary A* would, so costed areas and portals are handled exactly. The heuristic is
+admissible (PortalBound, or landmarks when given), so the path cost matches an optimal search with far fewer expansions.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy
+
+from open_list import make_open_list
+from portal_index import PortalBound
+from search_state import CLOSED, OPEN
+from solver import SearchResult, SearchStats
+
+# Arrival direction (row step, col step) kept per node; ANY for the start and for portal jumps
+ANY = (0, 0)
+
+# Where runs stop on a PreparedMap, whatever the end of the search. For every row the cols where a run moving right (and
+# one moving left) has to stop are listed in order: barriers, cells that are not plain, and cells where the run is forced
+# to be able to turn. Rows are worked out with NumPy the first time a jump touches them, and vertical runs are remembered
+# per (cell, direction), so every later query on the same map only pays for lookups
+class RunTable:
+    def __init__(self, prepared):
+        grid = prepared.grid
+        self.rows, self.cols = grid.rows, grid.cols
+        self.passable, self.cost = grid.passable, grid.cost
+        self.entrances = prepared.portal_table.groups_of
+        self.sorted_entrances = numpy.sort(numpy.fromiter(self.entrances, dtype=numpy.int64, count=len(self.entrances)))
+        passable, cost, _ = grid.arrays()
+        self.passable_rows, self.cost_rows = passable, cost
+        self.horizontal = {} # Row -> (stops moving right, which of them are jump points, the same moving left)
+        self.vertical = {} # (cell, row step) -> (jump point or None, steps), see vertical_run()
+
+    def is_plain(self, row, col):
+        if row < 0 or row >= self.rows or col < 0 or col >= self.cols:
+            return False
+        index = row * self.cols + col
+        return self.passable[index] and self.cost[index] == 1 and index not in self.entrances
+
+    def is_open(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols and self.passable[row * self.cols + col]
+
+    # Open and plain cells of a row as two boolean arrays (all False for rows off the grid)
+    def row_cells(self, row):
+        if row < 0 or row >= self.rows:
+            empty = numpy.zeros(self.cols, dtype=bool)
+            return empty, empty
+        is_open = self.passable_rows[row] != 0
+        plain = is_open & (self.cost_rows[row] == 1)
+        first = row * self.cols
+        low, high = numpy.searchsorted(self.sorted_entrances, (first, first + self.cols))
+        plain[self.sorted_entrances[low:high] - first] = False
+        return is_open, plain
+
+    def row(self, row):
+        stops = self.horizontal.get(row)
+        if stops is None:
+            stops = self.horizontal[row] = self.row_stops(row)
+        return stops
+
+    def row_stops(self, row):
+        is_open, plain = self.row_cells(row)
+        # A run moving right has to be able to turn at col when the cell above or below col is open but the one behind it
+        # (at col - 1) is not plain, so no earlier turn could have been taken instead; moving left mirrors this
+        forced_right = numpy.zeros(self.cols, dtype=bool)
+        forced_left = numpy.zeros(self.cols, dtype=bool)
+        for side in (row - 1, row + 1):
+            side_open, side_plain = self.row_cells(side)
+            forced_right[1:] |= side_open[1:] & ~side_plain[:-1]
+            forced_left[:-1] |= side_open[:-1] & ~side_plain[1:]
+        stops = []
+        for forced in (forced_right, forced_left):
+            found = is_open & (~plain | forced)
+            cols = numpy.flatnonzero(found | ~is_open)
+            stops.append(array("i", cols.astype(numpy.int32).tobytes()))
+            stops.append(found[cols].tobytes())
+        return stops
+
+    # Follow a horizontal run from (row, col) moving by dc; returns the jump point reached (or None) and the number of steps
+    # taken, counting the barrier or the edge of the grid that ended a run without one
+    def horizontal_run(self, row, col, dc):
+        right, right_found, left, left_found = self.row(row)
+        if dc > 0:
+            i = bisect_right(right, col)
+            if i == len(right):
+                return None, self.cols - col
+            stop, found = right[i], right_found[i]
+        else:
+            i = bisect_left(left, col) - 1
+            if i < 0:
+                return None, col + 1
+            stop, found = left[i], left_found[i]
+        return (row * self.cols + stop if found else None), abs(stop - col)
+
+    # Follow a vertical run; a cell is a jump point if it is not plain or a horizontal run from it reaches one
+    def vertical_run(self, row, col, dr):
+        key = ((row * self.cols + col), dr)
+        found = self.vertical.get(key)
+        if found is None:
+            found = self.vertical[key] = self.run_vertical(row, col, dr)
+        return found
+
+    def run_vertical(self, row, col, dr):
+        steps = 0
+        while True:
+            row += dr
+            steps += 1
+            if not self.is_open(row, col):
+                return None, steps
+            if not self.is_plain(row, col):
+                return row * self.cols + col, steps
+            if self.horizontal_run(row, col, 1)[0] is not None or self.horizontal_run(row, col, -1)[0] is not None:
+                return row * self.cols + col, steps
+
+# The RunTable of a map with what one search adds to it: runs also stop at the end, wherever it lies on them
+class JumpGrid:
+    def __init__(self, prepared, end):
+        if prepared.jump_runs is None:
+            prepared.jump_runs = RunTable(prepared)
+        self.runs = prepared.jump_runs
+        self.cols = prepared.grid.cols
+        self.is_plain, self.is_open = self.runs.is_plain, self.runs.is_open
+        self.end = end
+        self.end_row, self.end_col = divmod(end, self.cols)
+
+    # A horizontal run (moving by dc) has to be allowed to turn at (row, col) in direction dr
+    def is_forced(self, row, col, dc, dr):
+        return self.is_open(row + dr, col) and not self.is_plain(row + dr, col - dc)
+
+    # Cells a run checks before it stops: all of them up to a jump point, but not the barrier or edge that ends one without
+    @staticmethod
+    def reach(point, steps):
+        return steps if point is not None else steps - 1
+
+    def jump_horizontal(self, row, col, dc):
+        point, steps = self.runs.horizontal_run(row, col, dc)
+        if row == self.end_row and 0 < (self.end_col - col) * dc <= self.reach(point, steps):
+            return self.end, (self.end_col - col) * dc
+        return point, steps
+
+    # The run stops on the row of the end if the end is in this col or can be reached by a horizontal run from there
+    def jump_vertical(self, row, col, dr):
+        point, steps = self.runs.vertical_run(row, col, dr)
+        distance = (self.end_row - row) * dr
+        if 0 < distance <= self.reach(point, steps):
+            if col == self.end_col or self.jump_horizontal(self.end_row, col, 1)[0] == self.end or \
+                    self.jump_horizontal(self.end_row, col, -1)[0] == self.end:
+                return self.end_row * self.cols + col, distance
+        return point, steps
+
+# Fill in the cells between consecutive jump points: a run in the direction recorded for each point, or a portal edge
+def expand_path(jump_points, arrival, cols):
+    path = [jump_points[0]]
+    for index in jump_points[1:]:
+        dr, dc = arrival[index]
+        if (dr, dc) != ANY:
+            step = dr * cols + dc
+            path.extend(range(path[-1] + step, index, step))
+        path.append(index)
+    return path
+
+# Jump point search between two cell indices of a PreparedMap; the result's path lists every cell, like solver.search()
+def jump_search(prepared, start, end, state=None, observer=None, open_list="binary", landmarks=None, stats=None):
+    grid = prepared.grid
+    cols, cost = grid.cols, grid.cost
+    portal_table = prepared.portal_table
+    jumps = JumpGrid(prepared, end)
+    if stats is None:
+        stats = SearchStats()
+
+    if landmarks is not None:
+        targets = landmarks.targets(end)
+        estimate = lambda index: landmarks.estimate(index, targets)
+        portal_indexes = ()
+    else:
+        bound = PortalBound(grid, portal_table, end)
+        estimate = bound.estimate
+        portal_indexes = (bound.entrances,)
+    estimate = stats.time_heuristic(estimate)
+
+    borrowed = state is None
+    if borrowed:
+        state = prepared.take_state()
+    generation = state.begin()
+    stamp, status, g_score = state.stamp, state.status, state.g
+    arrival = {start: ANY}
+    state.set_g(start, 0, -1)
+    state.make_open(start)
+
+    open_set = stats.time_open_list(make_open_list(open_list, len(grid)))
+    open_set.push(start, estimate(start))
+    stats.pushed += 1
+    stats.heuristic_evaluations += 1
+    fired = {} # Portal groups listed so far, see PortalTable.fire()
+
+    while open_set:
+        current = open_set.pop()
+        stats.popped += 1
+        stats.expanded += 1
+        if current == end:
+            path = expand_path(state.reconstruct_path(end), arrival, cols)
+            if borrowed:
+                prepared.give_state(state)
+            stats.finish((open_set,), portal_indexes)
+            if observer:
+                observer.on_path([divmod(index, cols) for index in path])
+            return SearchResult(path, g_score[end], stats)
+
+        row, col = divmod(current, cols)
+        dr, dc = arrival[current]
+        current_g = g_score[current]
+        # Successors as (cell, arrival direction, cost of getting there)
+        successors = []
+        if not jumps.is_plain(row, col) or (dr, dc) == ANY:
+            # Start, costed cells and cells next to portals: look everywhere, portal edges included
+            runs = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+            for neighbor in portal_table.fire(current, current_g, fired):
+                successors.append((neighbor, ANY, cost[neighbor]))
+        elif dr:
+            # Arrived vertically: carry on, or turn either way
+            runs = [(dr, 0), (0, 1), (0, -1)]
+        else:
+            # Arrived horizontally: carry on, and only turn where forced
+            runs = [(0, dc)] + [(turn, 0) for turn in (1, -1) if jumps.is_forced(row, col, dc, turn)]
+        for run_dr, run_dc in runs:
+            if run_dr:
+                point, steps = jumps.jump_vertical(row, col, run_dr)
+            else:
+                point, steps = jumps.jump_horizontal(row, col, run_dc)
+            if point is not None:
+                # Every cell passed on the way is a plain cell of cost 1
+                successors.append((point, (run_dr, run_dc), steps - 1 + cost[point]))
+
+        for neighbor, neighbor_direction, step_cost in successors:
+            temp_g_score = current_g + step_cost
+            if stamp[neighbor] != generation or temp_g_score < g_score[neighbor]:
+                state.set_g(neighbor, temp_g_score, current)
+                arrival[neighbor] = neighbor_direction
+                open_set.push(neighbor, temp_g_score + estimate(neighbor))
+                stats.relaxations += 1
+                stats.heuristic_evaluations += 1
+                stats.pushed += 1
+                if observer:
+                    observer.on_relax(divmod(neighbor, cols), temp_g_score)
+                if status[neighbor] != OPEN:
+                    status[neighbor] = OPEN
+                    if observer:
+                        observer.on_open(divmod(neighbor, cols))
+        if len(open_set) > stats.peak_open:
+            stats.peak_open = len(open_set)
+
+        if observer:
+            observer.on_step()
+        status[current] = CLOSED
+        if observer and current != start:
+            observer.on_close(divmod(current, cols))
+
+    if borrowed:
+        prepared.give_state(state)
+    stats.finish((open_set,), portal_indexes)
+    return SearchResult(None, float("inf"), stats)
@@ -0,0 +1,99 @@
+"""
+@author: ChingHongFung
+Landmark (ALT) heuristic. Exact costs to and from a few landmark cells are worked out up front over the real cost grid,
+portal edges included. By the triangle inequality, for any landmark L the cost of going from n to the end is at least
+d(L, end) - d(L, n) and d(n, L) - d(end, L); the largest of these bounds never overestimates, so A* with it returns
+optimal paths. Unlike the Manhattan/portal heuristic it knows where portals actually lead.
+
+    landmarks = Landmarks(grid)
+    result = solve(grid, start, end, landmarks=landmarks)
+
+The tables describe the grid as it was when they were built; build new ones after editing the map.
+"""
+
+import re
+from array import array
+
+from dijkstra import UNREACHABLE, dijkstra
+from solver import prepare_neighbors
+
+# Matches a passable cell in GridMap.passable
+OPEN_CELL = re.compile(rb"[^\x00]")
+
+class Landmarks:
+    def __init__(self, grid, count=4, portals=None, landmarks=None):
+        if portals is None:
+            portals = grid.portal_groups()
+        self.grid = grid
+        portal_table = prepare_neighbors(grid, portals)
+        self.landmarks = []
+        self.from_landmark = [] # d(L, n) for every cell n
+        self.to_landmark = [] # d(n, L) for every cell n
+        if landmarks is None:
+            landmarks = self.choose(portal_table, count)
+        for landmark in landmarks:
+            self.add(portal_table, landmark)
+
+    def add(self, portal_table, landmark):
+        self.landmarks.append(landmark)
+        self.from_landmark.append(dijkstra(self.grid, portal_table, landmark))
+        self.to_landmark.append(dijkstra(self.grid, portal_table, landmark, reverse=True))
+
+    # Farthest-point selection: start from the cell farthest from the first open cell, then keep adding the cell whose
+    # distance to its nearest chosen landmark is largest, so the landmarks end up spread around the edges of the map
+    def choose(self, portal_table, count):
+        first = OPEN_CELL.search(self.grid.passable)
+        if first is None or count < 1:
+            return []
+        dist = dijkstra(self.grid, portal_table, first.start())
+        chosen = []
+        nearest = None
+        for _ in range(count):
+            candidates = dist if nearest is None else nearest
+            best = -1
+            best_distance = 0
+            for index, distance in enumerate(candidates):
+                if distance != UNREACHABLE and distance > best_distance:
+                    best, best_distance = index, distance
+            if best < 0 or best in chosen:
+                break
+            chosen.append(best)
+            dist = dijkstra(self.grid, portal_table, best)
+            if nearest is None:
+                nearest = dist
+            else:
+                nearest = array("i", map(min, nearest, dist))
+        return chosen
+
+    # Read the table entries for the end cell once per search; the result is handed to estimate() or estimate_from()
+    def targets(self, end):
+        return [(table_from, table_to, table_from[end], table_to[end])
+                for table_from, table_to in zip(self.from_landmark, self.to_landmark)]
+
+    # Lower bound on the cost from the cell targets() was called with to index (the other way round from estimate())
+    def estimate_from(self, index, targets):
+        best = 0
+        for table_from, table_to, from_source, to_source in targets:
+            from_index = table_from[index]
+            # d(L, index) - d(L, source)
+            if from_index != UNREACHABLE and from_source != UNREACHABLE and from_index - from_source > best:
+                best = from_index - from_source
+            to_index = table_to[index]
+            # d(source, L) - d(index, L)
+            if to_source != UNREACHABLE and to_index != UNREACHABLE and to_source - to_index > best:
+                best = to_source - to_index
+        return best
+
+    # Lower bound on the cost from index to the end cell targets() was called with
+    def estimate(self, index, targets):
+        best = 0
+        for table_from, table_to, from_end, to_end in targets:
+            from_index = table_from[index]
+            # d(L, end) - d(L, index)
+            if from_end != UNREACHABLE and from_index != UNREACHABLE and from_end - from_index > best:
+                best = from_end - from_index
+            to_index = table_to[index]
+            # d(index, L) - d(end, L)
+            if to_index != UNREACHABLE and to_end != UNREACHABLE and to_index - to_end > best:
+                best = to_index - to_end
+        return best
@@ -0,0 +1,47 @@
+"""
+@author: ChingHongFung
+Saving and loading maps. Maps used to exist only while main() was running; a map file keeps everything the solver needs:
+passability, cost per cell (as add_cost() leaves it), portal groups and the start and end.
+
+Layout (little endian): a 32 byte header (HEADER: magic, rows, cols, start index, end index, -1 for none, padding) and then
+the passable, cost and portal buffers of rows * cols bytes each, exactly as GridMap holds them. load_map() memory-maps the
+file and wraps the buffers with GridMap.from_buffers(), so nothing is read or copied up front: opening a map of several GB
+is immediate and pages are read in as the search touches them. Processes mapping the same file share the same pages.
+
+    save_map("level.map", grid, start, end)
+    grid, start, end = load_map("level.map")
+"""
+
+import mmap
+import struct
+
+from grid_map import GridMap
+
+MAGIC = b"ASTARMAP"
+HEADER = struct.Struct("<8sIIii8x")
+
+# Write grid (a GridMap) to path; start and end are (row, col) or None
+def save_map(path, grid, start=None, end=None):
+    start = -1 if start is None else grid.index(*start)
+    end = -1 if end is None else grid.index(*end)
+    with open(path, "wb") as map_file:
+        map_file.write(HEADER.pack(MAGIC, grid.rows, grid.cols, start, end))
+        map_file.write(memoryview(grid.passable).cast("B"))
+        map_file.write(memoryview(grid.cost).cast("B"))
+        map_file.write(memoryview(grid.portal).cast("B"))
+
+# Map the file at path; returns (grid, start, end) with start and end as (row, col) or None. The grid is read only unless
+# writable is True, in which case edits stay private to this process (copy on write) and never reach the file
+def load_map(path, writable=False):
+    with open(path, "rb") as map_file:
+        mapped = mmap.mmap(map_file.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+    magic, rows, cols, start, end = HEADER.unpack_from(mapped)
+    size = rows * cols
+    if magic != MAGIC:
+        raise ValueError("%s is not a map file" % path)
+    if len(mapped) < HEADER.size + 3 * size:
+        raise ValueError("%s is cut short: expected %d bytes, found %d" % (path, HEADER.size + 3 * size, len(mapped)))
+    # The memoryviews keep the mapping open for as long as the grid is in use
+    buffer = memoryview(mapped)[HEADER.size:]
+    grid = GridMap.from_buffers(rows, cols, buffer[:size], buffer[size:2 * size], buffer[2 * size:3 * size])
+    return grid, None if start < 0 else divmod(start, cols), None if end < 0 else divmod(end, cols)
@@ -0,0 +1,99 @@
+"""
+@author: ChingHongFung
+Importers for the Moving AI grid benchmark formats (https://movingai.com/benchmarks/formats.html), so the solver can be
+checked on standard maps and scenario sets.
+
+A .map file is a short header (type, height, width, "map") followed by one line of terrain characters per row. Each character
+is turned into the cost model of Spot/make_grid() with TERRAIN: a cost of 0 makes a barrier, anything else is the cost of
+stepping onto the cell (as add_cost() would leave it). Rows are converted with bytes.translate() rather than character by
+character.
+
+A .scen file lists queries, one per line: bucket, map file, map width, map height, start x, start y, goal x, goal y and the
+optimal length. x is the column and y the row. read_scenarios() yields them one line at a time, so scenario sets of any
+size can be fed straight into BatchSolver.solve_batch() or ParallelSolver.imap() through scenario_queries().
+
+The benchmark lengths are for 8-connected (octile) movement; update_neighbors() only moves in 4 directions, so the lengths
+found here are longer and are not expected to match optimal_length.
+"""
+
+import re
+
+from grid_map import MAX_COST, GridMap
+
+# Cost of each terrain character, 0 for cells that cannot be entered. Swamp is passable but slow; water can only be crossed
+# from water in the benchmarks, which 4-connected land movement cannot do, so it is a barrier
+TERRAIN = {
+    ".": 1, # passable terrain
+    "G": 1, # passable terrain
+    "S": 3, # swamp
+    "@": 0, # out of bounds
+    "O": 0, # out of bounds
+    "T": 0, # trees
+    "W": 0, # water
+}
+
+HEADER_LINE = re.compile(r"(type|height|width)\s+(\S+)")
+
+# One query of a scenario file; start and end are (row, col)
+class Scenario:
+    def __init__(self, bucket, map_name, width, height, start, end, optimal_length):
+        self.bucket = bucket
+        self.map_name = map_name
+        self.width = width
+        self.height = height
+        self.start = start
+        self.end = end
+        self.optimal_length = optimal_length
+
+# Byte translation tables from terrain characters to the cost and passable buffers; unknown characters are barriers
+def terrain_tables(terrain):
+    cost = bytearray([1]) * 256
+    passable = bytearray(256)
+    for char, char_cost in terrain.items():
+        if not 0 <= char_cost <= MAX_COST:
+            raise ValueError("Cost of terrain %r must be between 0 and %d" % (char, MAX_COST))
+        if char_cost:
+            cost[ord(char)] = char_cost
+            passable[ord(char)] = 1
+    return bytes(cost), bytes(passable)
+
+# Read a .map file into a GridMap
+def load_moving_ai_map(path, terrain=None):
+    cost_table, passable_table = terrain_tables(TERRAIN if terrain is None else terrain)
+    with open(path, "rb") as map_file:
+        header = {}
+        for line in map_file:
+            line = line.decode("ascii").strip()
+            if line == "map":
+                break
+            match = HEADER_LINE.match(line)
+            if match:
+                header[match.group(1)] = match.group(2)
+        if "height" not in header or "width" not in header:
+            raise ValueError("%s is missing its height or width" % path)
+        rows, cols = int(header["height"]), int(header["width"])
+
+        grid = GridMap(rows, cols)
+        passable, cost = memoryview(grid.passable), memoryview(grid.cost).cast("B")
+        for row in range(rows):
+            line = map_file.readline().rstrip(b"\r\n")
+            if len(line) != cols:
+                raise ValueError("%s: row %d has %d cells, expected %d" % (path, row, len(line), cols))
+            passable[row * cols:(row + 1) * cols] = line.translate(passable_table)
+            cost[row * cols:(row + 1) * cols] = line.translate(cost_table)
+    return grid
+
+# Yield a Scenario for every query in a .scen file, reading one line at a time
+def read_scenarios(path):
+    with open(path) as scen_file:
+        for line in scen_file:
+            fields = line.split("\t") if "\t" in line else line.split()
+            if len(fields) < 9 or fields[0] == "version":
+                continue
+            bucket, map_name, width, height, start_x, start_y, goal_x, goal_y = fields[:8]
+            yield Scenario(int(bucket), map_name, int(width), int(height), (int(start_y), int(start_x)),
+                           (int(goal_y), int(goal_x)), float(fields[8]))
+
+# (start, end) pairs of a .scen file, ready for BatchSolver.solve_batch() or ParallelSolver.imap()
+def scenario_queries(path):
+    return ((scenario.start, scenario.end) for scenario in read_scenarios(path))
@@ -0,0 +1,228 @@
+"""
+@author: ChingHongFung
+Open lists for the solver. queue.PriorityQueue takes a lock on every put/get and cannot change the priority of a node that is
+already queued, so a node whose g score improved kept its old f score. Every open list here has the same small interface:
+
+    push(index, key)  add a node, or change its key if it is already queued
+    pop()             remove and return the node with the lowest key (oldest first when keys tie)
+    peek()            (node, key) with the lowest key, left on the open list
+    len(open_list)    number of nodes queued
+    stale             outdated entries skipped by pop()/peek() so far (always 0 for DaryHeap, which has none)
+
+Pick one per search with solve(..., open_list="binary" | "dary" | "bucket").
+"""
+
+import heapq
+from collections import deque
+
+# Binary heap (heapq) with lazy deletion: changing a key pushes a new entry and the outdated one is skipped when popped
+class BinaryHeap:
+    def __init__(self, size):
+        self.heap = []
+        self.keys = {} # Current key of every queued node
+        self.count = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, index):
+        return index in self.keys
+
+    def push(self, index, key):
+        if self.keys.get(index) == key:
+            return
+        self.keys[index] = key
+        self.count += 1
+        heapq.heappush(self.heap, (key, self.count, index))
+
+    def pop(self):
+        heap, keys = self.heap, self.keys
+        while True:
+            key, _, index = heapq.heappop(heap)
+            # Skip entries left behind by a key change or by a node already popped
+            if keys.get(index) == key:
+                del keys[index]
+                return index
+            self.stale += 1
+
+    # Lowest (index, key) without removing it
+    def peek(self):
+        heap, keys = self.heap, self.keys
+        while heap:
+            key, _, index = heap[0]
+            if keys.get(index) == key:
+                return index, key
+            heapq.heappop(heap)
+            self.stale += 1
+        raise IndexError("peek at an empty BinaryHeap")
+
+    # Take a node off the open list (its heap entry is skipped later)
+    def remove(self, index):
+        self.keys.pop(index, None)
+
+# Indexed d-ary heap with real decrease-key: every node is in the heap at most once and its slot is tracked in self.slot.
+# slot is a dict holding only the queued nodes, so creating a heap costs nothing however large the grid is
+class DaryHeap:
+    def __init__(self, size, d=4):
+        self.d = d
+        self.nodes = [] # Heap of node indices
+        self.entries = [] # (key, count) for the node in the same heap slot
+        self.slot = {} # Node -> its index in nodes
+        self.count = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, index):
+        return index in self.slot
+
+    def push(self, index, key):
+        self.count += 1
+        entry = (key, self.count)
+        i = self.slot.get(index, -1)
+        if i < 0:
+            self.nodes.append(index)
+            self.entries.append(entry)
+            self._sift_up(len(self.nodes) - 1)
+        else:
+            old = self.entries[i]
+            if old[0] == key:
+                return
+            self.entries[i] = entry
+            if entry < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+
+    def pop(self):
+        nodes, entries = self.nodes, self.entries
+        index = nodes[0]
+        del self.slot[index]
+        last_node = nodes.pop()
+        last_entry = entries.pop()
+        if nodes:
+            nodes[0] = last_node
+            entries[0] = last_entry
+            self._sift_down(0)
+        return index
+
+    def peek(self):
+        if not self.nodes:
+            raise IndexError("peek at an empty DaryHeap")
+        return self.nodes[0], self.entries[0][0]
+
+    def _sift_up(self, i):
+        nodes, entries, slot, d = self.nodes, self.entries, self.slot, self.d
+        node, entry = nodes[i], entries[i]
+        while i > 0:
+            parent = (i - 1) // d
+            if entries[parent] <= entry:
+                break
+            nodes[i] = nodes[parent]
+            entries[i] = entries[parent]
+            slot[nodes[i]] = i
+            i = parent
+        nodes[i] = node
+        entries[i] = entry
+        slot[node] = i
+
+    def _sift_down(self, i):
+        nodes, entries, slot, d = self.nodes, self.entries, self.slot, self.d
+        size = len(nodes)
+        node, entry = nodes[i], entries[i]
+        while True:
+            first = i * d + 1
+            if first >= size:
+                break
+            # Find the smallest child
+            best = first
+            for child in range(first + 1, min(first + d, size)):
+                if entries[child] < entries[best]:
+                    best = child
+            if entry <= entries[best]:
+                break
+            nodes[i] = nodes[best]
+            entries[i] = entries[best]
+            slot[nodes[i]] = i
+            i = best
+        nodes[i] = node
+        entries[i] = entry
+        slot[node] = i
+
+# Bucket queue for integer keys (the f scores produced by integer Spot costs): one FIFO bucket per key value and a pointer to
+# the lowest bucket that may hold nodes. Key changes use lazy deletion like BinaryHeap
+class BucketQueue:
+    def __init__(self, size):
+        self.buckets = []
+        self.keys = {}
+        self.lowest = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, index):
+        return index in self.keys
+
+    def push(self, index, key):
+        if key != int(key):
+            raise ValueError("BucketQueue only takes integer keys, got %r" % (key,))
+        key = int(key)
+        if self.keys.get(index) == key:
+            return
+        self.keys[index] = key
+        buckets = self.buckets
+        while len(buckets) <= key:
+            buckets.append(deque())
+        buckets[key].append(index)
+        # An inconsistent heuristic can produce keys below the current lowest bucket
+        if key < self.lowest:
+            self.lowest = key
+
+    def pop(self):
+        buckets, keys = self.buckets, self.keys
+        if not keys:
+            raise IndexError("pop from an empty BucketQueue")
+        key = self.lowest
+        while True:
+            bucket = buckets[key]
+            while bucket:
+                index = bucket.popleft()
+                if keys.get(index) == key:
+                    del keys[index]
+                    self.lowest = key
+                    return index
+                self.stale += 1
+            key += 1
+
+    def peek(self):
+        buckets, keys = self.buckets, self.keys
+        if not keys:
+            raise IndexError("peek at an empty BucketQueue")
+        key = self.lowest
+        while True:
+            bucket = buckets[key]
+            while bucket:
+                index = bucket[0]
+                if keys.get(index) == key:
+                    self.lowest = key
+                    return index, key
+                bucket.popleft()
+                self.stale += 1
+            key += 1
+
+OPEN_LISTS = {
+    "binary": BinaryHeap,
+    "dary": DaryHeap,
+    "bucket": BucketQueue,
+}
+
+# Create an open list by name (or from a class with the same interface) for a grid with size cells
+def make_open_list(kind, size):
+    if isinstance(kind, str):
+        if kind not in OPEN_LISTS:
+            raise ValueError("Unknown open list %r, pick one of %s" % (kind, ", ".join(sorted(OPEN_LISTS))))
+        kind = OPEN_LISTS[kind]
+    return kind(size)
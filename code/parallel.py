@@ -0,0 +1,102 @@
+"""
+@author: ChingHongFung
+Run batches of path queries on several processes. The grid buffers are copied once into a multiprocessing.shared_memory
+block that every worker maps (no per-task pickling of the map); each worker wraps it in a GridMap without copying, prepares
+the map once and keeps its own BatchSolver. Queries are sent out in chunks and results stream back as chunks complete.
+
+    with ParallelSolver(grid) as pool:
+        for query_no, cost, path in pool.imap(queries):
+            ...
+
+grid may also be the path of a map file (see map_file.py); every worker then memory-maps that file itself, so the
+processes share the file's pages and nothing is copied at all.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+from batch import NO_PATH, BatchSolver
+from grid_map import GridMap
+from map_file import load_map
+
+# Per-process state of a worker, set up once by init_worker()
+worker = {}
+
+def init_worker(name, rows, cols, portals, open_list):
+    shm = shared_memory.SharedMemory(name=name)
+    size = rows * cols
+    buffer = shm.buf
+    grid = GridMap.from_buffers(rows, cols, buffer[:size], buffer[size:2 * size], buffer[2 * size:3 * size])
+    worker["shm"] = shm # Keep the mapping alive for as long as the worker runs
+    worker["solver"] = BatchSolver(grid, portals, open_list)
+
+def init_map_worker(path, portals, open_list):
+    grid, _, _ = load_map(path)
+    worker["solver"] = BatchSolver(grid, portals, open_list)
+
+# Solve one chunk of queries in a worker; returns the number of its first query with the chunk's BatchResult
+def solve_chunk(chunk):
+    first, queries = chunk
+    return first, worker["solver"].solve_batch(queries)
+
+# Split queries into (number of first query, list of queries) chunks without reading them all in first
+def make_chunks(queries, chunk_size):
+    chunk = []
+    first = 0
+    for number, query in enumerate(queries):
+        if not chunk:
+            first = number
+        chunk.append(query)
+        if len(chunk) == chunk_size:
+            yield first, chunk
+            chunk = []
+    if chunk:
+        yield first, chunk
+
+class ParallelSolver:
+    def __init__(self, grid, processes=None, portals=None, open_list="binary", chunk_size=64):
+        self.chunk_size = chunk_size
+        if isinstance(grid, str):
+            self.shm = None
+            self.pool = multiprocessing.Pool(processes, initializer=init_map_worker, initargs=(grid, portals, open_list))
+            return
+        size = len(grid)
+        # One shared block holding passable, cost and portal buffers one after the other
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, 3 * size))
+        buffer = self.shm.buf
+        buffer[:size] = memoryview(grid.passable).cast("B")
+        buffer[size:2 * size] = memoryview(grid.cost).cast("B")
+        buffer[2 * size:3 * size] = memoryview(grid.portal).cast("B")
+        del buffer
+        self.pool = multiprocessing.Pool(processes, initializer=init_worker,
+                                         initargs=(self.shm.name, grid.rows, grid.cols, portals, open_list))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Yield (query number, cost, path) for every (start, end) query, in the order chunks finish. cost is NO_PATH and
+    # path is None when there is no path
+    def imap(self, queries, chunk_size=None):
+        chunks = make_chunks(queries, chunk_size or self.chunk_size)
+        for first, results in self.pool.imap_unordered(solve_chunk, chunks):
+            for i in range(len(results)):
+                yield first + i, results.costs[i], results.get_path(i)
+
+    # Solve every query and return the costs in query order
+    def solve_batch(self, queries):
+        costs = {}
+        for number, cost, _ in self.imap(queries):
+            costs[number] = cost
+        return [costs.get(number, NO_PATH) for number in range(len(costs))]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
@@ -0,0 +1,132 @@
+"""
+@author: ChingHongFung
+Cache of solved paths for agents that keep asking for the same (start, end) pairs while the map stays the same. Entries are
+keyed on (start, end, map version); GridMap.version changes with every edit, so a path found before an edit is never
+handed out after it. The cache holds at most capacity paths (and, if max_cells is set, at most that many path cells in
+total) and drops the least recently used one when full.
+
+Any part of an optimal path that runs to its end is itself an optimal path, so a query starting on a cell of a cached path
+to the same end is answered from that path as well. This needs a method that returns optimal paths, which is why the cache
+uses the bidirectional search by default (see solver.solve() for the others).
+
+    cache = PathCache(grid, capacity=256)
+    result = cache.solve((0, 0), (10, 12))
+    cache.hits, cache.suffix_hits, cache.misses
+"""
+
+from collections import OrderedDict
+
+from grid_map import GridMap
+from search_state import SearchState
+from solver import PreparedMap, SearchResult, SearchStats, solve
+
+class PathCache:
+    def __init__(self, grid, capacity=1024, max_cells=None, portals=None, open_list="binary", method="bidirectional",
+                 reuse_suffixes=True):
+        if isinstance(grid, PreparedMap):
+            self.prepared = grid
+            grid = grid.grid
+        else:
+            self.prepared = None
+            if not isinstance(grid, GridMap):
+                grid = GridMap.from_costs(grid)
+        self.grid = grid
+        self.portals = portals
+        self.capacity = capacity
+        self.max_cells = max_cells
+        self.open_list = open_list
+        self.method = method
+        self.reuse_suffixes = reuse_suffixes
+        self.entries = OrderedDict() # (start, end, version) -> (path, costs to end along the path), oldest use first
+        self.suffixes = {} # (cell, end) -> (key of an entry whose path passes through cell, position of cell on it)
+        self.cells = 0 # Path cells held by all entries
+        self.version = None
+        self.state = None # Search state(s) shared by every miss, made on the first one and kept across map edits
+        self.hits = 0
+        self.suffix_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        queries = self.hits + self.suffix_hits + self.misses
+        return (self.hits + self.suffix_hits) / queries if queries else 0.0
+
+    # Path between two (row, col) positions, from the cache when possible; answers from the cache have zero search stats
+    def solve(self, start, end):
+        start, end = tuple(start), tuple(end)
+        self.check_version()
+        key = (start, end, self.version)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            path, costs = entry
+            return SearchResult(None if path is None else list(path), costs[0], SearchStats())
+
+        suffix = self.suffixes.get((start, end))
+        if suffix is not None:
+            self.suffix_hits += 1
+            key, position = suffix
+            self.entries.move_to_end(key)
+            path, costs = self.entries[key]
+            return SearchResult(path[position:], costs[position], SearchStats())
+
+        self.misses += 1
+        if self.state is None:
+            size = len(self.grid)
+            # The bidirectional search needs a state for each direction
+            self.state = (SearchState(size), SearchState(size)) if self.method == "bidirectional" else SearchState(size)
+        result = solve(self.prepared, start, end, state=self.state, open_list=self.open_list, method=self.method)
+        self.add(key, result)
+        return result
+
+    # Store a search result under key, evicting the least recently used entries to make room
+    def add(self, key, result):
+        if result.found:
+            # Cost from every cell of the path to its end
+            path, cost, cols = list(result.path), self.grid.cost, self.grid.cols
+            costs = [result.cost]
+            for row, col in path[1:]:
+                costs.append(costs[-1] - cost[row * cols + col])
+        else:
+            path, costs = None, [result.cost]
+        self.entries[key] = (path, costs)
+        if path is not None:
+            self.cells += len(path)
+            if self.reuse_suffixes:
+                end = key[1]
+                for position, cell in enumerate(path[1:-1], 1):
+                    self.suffixes[(cell, end)] = (key, position)
+        while len(self.entries) > self.capacity or self.max_cells is not None and self.cells > self.max_cells and \
+                len(self.entries) > 1:
+            self.evict()
+
+    # Drop the least recently used entry and every suffix pointing into it
+    def evict(self):
+        key, (path, _) = self.entries.popitem(last=False)
+        if path is not None:
+            self.cells -= len(path)
+            end = key[1]
+            for cell in path[1:-1]:
+                suffix = self.suffixes.get((cell, end))
+                if suffix is not None and suffix[0] == key:
+                    del self.suffixes[(cell, end)]
+
+    def clear(self):
+        self.entries.clear()
+        self.suffixes.clear()
+        self.cells = 0
+
+    # After the map has been edited every cached path is out of date and the map has to be prepared again; so does a
+    # PreparedMap passed in that was made before the last edit. The search state is kept: its generation counter already
+    # makes whatever the last search left in it read as untouched
+    def check_version(self):
+        if self.version == self.grid.version:
+            return
+        if self.prepared is None or self.prepared.version != self.grid.version:
+            self.prepared = PreparedMap(self.grid, self.portals)
+        self.version = self.grid.version
+        self.clear()
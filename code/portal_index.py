@@ -0,0 +1,123 @@
+"""
+@author: ChingHongFung
+Index answering "Manhattan distance to the nearest portal that has not been closed yet" for the portal heuristic in the
+solver. Looping over every portal for every improved neighbor made each relaxation O(#portals); here portals are bucketed
+into square tiles of the grid and a query only looks at the tiles in rings around the cell, stopping as soon as no further
+ring could hold anything closer. With portals spread over the map a query touches a handful of tiles. Closing a portal is
+a single set removal, so the index is kept up to date as the search goes.
+
+Only tiles that still hold an open portal are kept. Once the search has closed the portals around a cell, the next ring
+out can have more tiles than are left in the whole index; from there the query looks at the remaining tiles directly
+rather than walking rings of empty ones, so a query costs at most about as many tiles as still hold open portals.
+"""
+
+import math
+
+class PortalIndex:
+    def __init__(self, grid, portals, tile_size=None):
+        self.cols = grid.cols
+        portals = list(portals)
+        # Size tiles so there is roughly one portal per tile
+        if tile_size is None:
+            tile_size = max(1, int(math.sqrt(len(grid) / max(1, len(portals)))))
+        self.tile_size = tile_size
+        self.tile_rows = (grid.rows + tile_size - 1) // tile_size
+        self.tile_cols = (grid.cols + tile_size - 1) // tile_size
+        self.tiles = {} # (tile row, tile col) -> open portals in it; tiles with none are dropped
+        self.open_count = 0
+        self.checked = 0 # Portals looked at by nearest() so far
+        for index in portals:
+            row, col = divmod(index, self.cols)
+            tile = self.tiles.setdefault((row // tile_size, col // tile_size), set())
+            if index not in tile:
+                tile.add(index)
+                self.open_count += 1
+
+    def __len__(self):
+        return self.open_count
+
+    # Take a portal out of the index once it has been closed; indices that are not open portals are ignored
+    def close(self, index):
+        row, col = divmod(index, self.cols)
+        tile = self.tiles.get((row // self.tile_size, col // self.tile_size))
+        if tile and index in tile:
+            tile.remove(index)
+            self.open_count -= 1
+            if not tile:
+                del self.tiles[(row // self.tile_size, col // self.tile_size)]
+
+    # Manhattan distance from (row, col) to the nearest open portal, inf if there is none left
+    def nearest(self, row, col):
+        if not self.open_count:
+            return float("inf")
+        tiles, cols, size = self.tiles, self.cols, self.tile_size
+        tile_row, tile_col = row // size, col // size
+        max_ring = max(tile_row, self.tile_rows - 1 - tile_row, tile_col, self.tile_cols - 1 - tile_col)
+        best = float("inf")
+        for ring in range(max_ring + 1):
+            # Every cell in ring r is at least (r - 1) * size + 1 away, so stop once nothing there could beat best
+            if ring and (ring - 1) * size + 1 >= best:
+                break
+            if 8 * ring > len(tiles):
+                return self.nearest_in_tiles(row, col, ring, best)
+            for key in ring_tiles(tile_row, tile_col, ring):
+                tile = tiles.get(key)
+                if tile:
+                    self.checked += len(tile)
+                    for portal in tile:
+                        portal_row, portal_col = divmod(portal, cols)
+                        distance = abs(row - portal_row) + abs(col - portal_col)
+                        if distance < best:
+                            best = distance
+        return best
+
+    # Carry on a nearest() query that has looked at every tile closer than ring by going through the tiles left
+    def nearest_in_tiles(self, row, col, ring, best):
+        cols, size = self.cols, self.tile_size
+        tile_row, tile_col = row // size, col // size
+        for (other_row, other_col), tile in self.tiles.items():
+            if abs(other_row - tile_row) < ring and abs(other_col - tile_col) < ring:
+                continue
+            # Nearest any cell of the tile can be
+            top, left = other_row * size, other_col * size
+            bound = max(0, top - row, row - top - size + 1) + max(0, left - col, col - left - size + 1)
+            if bound >= best:
+                continue
+            self.checked += len(tile)
+            for portal in tile:
+                portal_row, portal_col = divmod(portal, cols)
+                distance = abs(row - portal_row) + abs(col - portal_col)
+                if distance < best:
+                    best = distance
+        return best
+
+# Tiles at Chebyshev distance ring from (tile_row, tile_col); tiles off the grid are produced too and simply not found
+def ring_tiles(tile_row, tile_col, ring):
+    if ring == 0:
+        yield tile_row, tile_col
+        return
+    for col in range(tile_col - ring, tile_col + ring + 1):
+        yield tile_row - ring, col
+        yield tile_row + ring, col
+    for row in range(tile_row - ring + 1, tile_row + ring):
+        yield row, tile_col - ring
+        yield row, tile_col + ring
+
+# Admissible lower bound on the cost from a cell to end that still allows for portals. A path either walks (at least the
+# Manhattan distance) or takes a portal: walk to the nearest cell bordering a portal, pay at least 1 to step out next to
+# another portal, then walk at least from the closest such cell to end. Unlike the portal heuristic in solver.search(),
+# this never overestimates, so searches using it return optimal paths
+class PortalBound:
+    def __init__(self, grid, portal_table, end):
+        self.cols = grid.cols
+        self.end_row, self.end_col = divmod(end, grid.cols)
+        entrances = list(portal_table.groups_of)
+        self.entrances = PortalIndex(grid, entrances)
+        self.exit_to_end = self.entrances.nearest(self.end_row, self.end_col) + 1
+
+    def estimate(self, index):
+        row, col = divmod(index, self.cols)
+        walk = abs(row - self.end_row) + abs(col - self.end_col)
+        if walk <= self.exit_to_end:
+            return walk
+        return min(walk, self.entrances.nearest(row, col) + self.exit_to_end)
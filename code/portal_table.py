@@ -0,0 +1,94 @@
+"""
+@author: ChingHongFung
+Portal edges as one shared adjacency entry per portal group instead of explicit cell-to-cell edges. The rule is the one
+add_portal_neighbors() used: a cell next to portal p can step onto any cell next to another portal q of the same group.
+Rather than appending every such pair to neighbor lists (portals x portals x neighbors x neighbors, duplicated each time it
+was called), each group keeps the cells bordering its portals together with the portals they border. Building the table is
+linear in the number of portals and any number of groups (portal colours) is supported.
+
+Listing a group still visits every cell bordering it, so a search that did so for every border cell it expands would do
+border cells x border cells work after all. Searches call fire() instead, which leaves out a group whenever an earlier
+listing in the same search already offered every cell of it at a cost no higher.
+"""
+
+no_neighbors = []
+
+# Stands for the portal a cell borders when it borders two or more of its group (and so reaches every other border cell)
+ALL = -1
+
+INF = float("inf")
+
+class PortalTable:
+    def __init__(self, grid, portals):
+        self.borders = [] # Per group: cell bordering a portal -> list of the portals of that group it borders
+        self.groups_of = {} # Cell -> groups whose portals it borders
+        for group_no, group in enumerate(portals):
+            borders = {}
+            for portal in set(group):
+                for cell in grid.get_neighbors(portal):
+                    if cell not in borders:
+                        borders[cell] = []
+                        self.groups_of.setdefault(cell, []).append(group_no)
+                    borders[cell].append(portal)
+            self.borders.append(borders)
+
+    def __bool__(self):
+        return bool(self.groups_of)
+
+    # Cells reachable from index through portals (may repeat a cell reachable through several groups)
+    def get_neighbors(self, index):
+        groups = self.groups_of.get(index)
+        if not groups:
+            return no_neighbors
+        result = []
+        for group_no in groups:
+            self.add_group(result, group_no, index)
+        return result
+
+    # Append the cells index reaches through the portals of one group
+    def add_group(self, result, group_no, index):
+        borders = self.borders[group_no]
+        own = borders[index]
+        if len(own) > 1:
+            # Next to two or more portals of this group: every other portal is reachable
+            result.extend(borders)
+        else:
+            # Only the cells bordering some portal other than our own one
+            portal = own[0]
+            for cell, cell_portals in borders.items():
+                if len(cell_portals) > 1 or cell_portals[0] != portal:
+                    result.append(cell)
+
+    # get_neighbors() for a search expanding index, without the groups that cannot give anything better than before. value is
+    # the part of a portal step's cost that does not depend on the cell reached: the g score of index for a search paying for
+    # the cell entered, g plus the cost of index for one paying for the cell left. fired is a dict kept by the search, empty
+    # at its start.
+    # A group listed from a cell bordering portal p offers every border cell except those bordering only p. Another listing
+    # at the same or a higher value adds nothing if it comes from p as well, or after a listing from a cell bordering two
+    # portals (which leaves nothing out), or after listings from two different portals (each offers what the other leaves
+    # out). So fired keeps, per group, the lowest two values it was listed at from different portals
+    def fire(self, index, value, fired):
+        groups = self.groups_of.get(index)
+        if not groups:
+            return no_neighbors
+        result = []
+        for group_no in groups:
+            own = self.borders[group_no][index]
+            portal = own[0] if len(own) == 1 else ALL
+            record = fired.get(group_no)
+            if record is None:
+                fired[group_no] = [value, portal, INF, None]
+            else:
+                first, first_portal, second, second_portal = record
+                if first <= value and (first_portal == portal or first_portal == ALL):
+                    continue
+                if second <= value: # Both listings were no higher and came from different portals
+                    continue
+                if portal == first_portal:
+                    record[0] = value
+                elif value < first:
+                    record[:] = [value, portal, first, first_portal]
+                else:
+                    record[2:] = [value, portal]
+            self.add_group(result, group_no, index)
+        return result
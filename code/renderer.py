@@ -0,0 +1,84 @@
+"""
+@author: ChingHongFung
+Faster drawing for the pygame front end. draw() used to fill the window, draw one rect per spot and then draw the grid lines
+with a nested loop on every frame, so each frame cost grew with the number of cells in Python. Here the colour of every
+cell lives in a NumPy buffer (one pixel per cell) that spots paint into when their colour changes; a frame is one
+surfarray blit of that buffer, one scale up to the window size and one blit of the grid lines, which are drawn only once
+onto a cached overlay.
+
+Between frames only a few cells change colour (the node just expanded and its neighbors), so once the first frame is up only
+the cells painted since the last frame are redrawn and passed to pygame.display.update() as dirty rectangles.
+
+    renderer = GridRenderer(win, rows, width)
+    grid = make_grid(rows, width, renderer)
+    renderer.draw()
+"""
+
+import numpy
+import pygame
+
+WHITE = (255, 255, 255)
+GREY = (128, 128, 128)
+
+# Colour that is never drawn, marking the see-through part of the grid line overlay
+TRANSPARENT = (255, 0, 255)
+
+# Repaint the whole window instead of cell by cell once more than this share of the cells has changed
+FULL_REDRAW = 0.25
+
+class GridRenderer:
+    def __init__(self, win, rows, width):
+        self.win = win
+        self.rows = rows
+        self.gap = width // rows
+        self.size = self.gap * rows
+        # colors[row, col] is the RGB colour of a spot; spots are drawn at x = row * gap, y = col * gap, which is the same
+        # [x, y] order surfarray uses
+        self.colors = numpy.empty((rows, rows, 3), dtype=numpy.uint8)
+        self.colors[:] = WHITE
+        self.dirty = set() # (row, col) of cells painted since the last frame
+        self.drawn = False # Whether a full frame has been shown yet
+        self.cells = pygame.Surface((rows, rows))
+        self.overlay = self.make_overlay(width)
+
+    # Grid lines in the same places draw_grid() put them, drawn once
+    def make_overlay(self, width):
+        overlay = pygame.Surface((width, width))
+        overlay.fill(TRANSPARENT)
+        overlay.set_colorkey(TRANSPARENT)
+        for i in range(self.rows):
+            pygame.draw.line(overlay, GREY, (0, i * self.gap), (width, i * self.gap))
+            pygame.draw.line(overlay, GREY, (i * self.gap, 0), (i * self.gap, width))
+        return overlay
+
+    # Called by a spot whenever its colour changes
+    def paint(self, row, col, color):
+        self.colors[row, col] = color
+        self.dirty.add((row, col))
+
+    # Show the current colours, repainting only the cells painted since the last frame
+    def draw(self):
+        dirty = self.dirty
+        if not self.drawn or len(dirty) > FULL_REDRAW * self.rows * self.rows:
+            self.redraw()
+            return
+        win, overlay, colors, gap = self.win, self.overlay, self.colors, self.gap
+        rects = []
+        for row, col in dirty:
+            rect = pygame.Rect(row * gap, col * gap, gap, gap)
+            win.fill(colors[row, col], rect)
+            win.blit(overlay, rect, rect) # Grid lines running through the cell
+            rects.append(rect)
+        dirty.clear()
+        if rects:
+            pygame.display.update(rects)
+
+    # Draw every cell and the grid lines, then show the whole frame
+    def redraw(self):
+        self.win.fill(WHITE)
+        pygame.surfarray.blit_array(self.cells, self.colors)
+        self.win.blit(pygame.transform.scale(self.cells, (self.size, self.size)), (0, 0))
+        self.win.blit(self.overlay, (0, 0))
+        self.dirty.clear()
+        self.drawn = True
+        pygame.display.update()
@@ -0,0 +1,74 @@
+"""
+@author: ChingHongFung
+Solver-owned bookkeeping for a search: g scores, where each node was reached from and whether it is open or closed. Nothing is
+stored on the grid (or in Spot colours), so the same grid can be searched again, or by several searches at once each with
+their own SearchState.
+
+Entries are stamped with a generation number; starting a new search just bumps the generation, so nothing has to be reset
+between searches and stale entries from earlier searches read as untouched.
+"""
+
+from array import array
+
+# Status values held in SearchState.status
+NEW = 0
+OPEN = 1
+CLOSED = 2
+
+# Generation stamps are 32 bit; wipe the stamps and start counting again before they would overflow
+MAX_GENERATION = 2 ** 32 - 1
+
+class SearchState:
+    def __init__(self, size):
+        self.size = size
+        self.generation = 0
+        self.stamp = array("I", [0]) * size # Generation in which the entry was last written
+        self.status = bytearray(size)
+        self.g = array("i", [0]) * size
+        self.came_from = array("i", [-1]) * size
+
+    # Start a new search; every entry written by an earlier search now reads as untouched
+    def begin(self):
+        if self.generation == MAX_GENERATION:
+            self.stamp = array("I", [0]) * self.size
+            self.generation = 0
+        self.generation += 1
+        return self.generation
+
+    def is_touched(self, index):
+        return self.stamp[index] == self.generation
+
+    def is_open(self, index):
+        return self.stamp[index] == self.generation and self.status[index] == OPEN
+
+    def is_closed(self, index):
+        return self.stamp[index] == self.generation and self.status[index] == CLOSED
+
+    def get_g(self, index):
+        if self.stamp[index] == self.generation:
+            return self.g[index]
+        return float("inf")
+
+    # Record a (better) way of reaching index
+    def set_g(self, index, g, came_from):
+        if self.stamp[index] != self.generation:
+            self.stamp[index] = self.generation
+            self.status[index] = NEW
+        self.g[index] = g
+        self.came_from[index] = came_from
+
+    def make_open(self, index):
+        self.status[index] = OPEN
+
+    def make_closed(self, index):
+        self.status[index] = CLOSED
+
+    # Walk back from index through came_from; returns the list of indices from the search start to index
+    def reconstruct_path(self, index):
+        path = [index]
+        came_from = self.came_from
+        while came_from[index] >= 0:
+            index = came_from[index]
+            path.append(index)
+        path.reverse()
+        return path
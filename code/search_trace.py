@@ -0,0 +1,163 @@
+"""
+@author: ChingHongFung
+Search traces: record what a search did to a compact binary file, then replay it in the pygame window later, e.g. to look at
+a bad route found by a server without rerunning it with the window open.
+
+    with TraceRecorder("route.trace", grid, start, end) as recorder:
+        solve(grid, start, end, observer=recorder)
+
+    python search_trace.py route.trace [expansions per frame]
+
+Recording is an observer, so a search run without one pays nothing. With one, every event is a fixed size struct record
+appended to a buffer that is written out in large chunks.
+
+File layout (little endian): a header (HEADER: magic, rows, cols, start index, end index), the map as it was searched
+(passable, cost and portal buffers of rows * cols bytes each, as in GridMap) and then one RECORD per event: the event kind,
+the cell index and a value (the new g score for RELAX, otherwise 0).
+"""
+
+import struct
+import sys
+import time
+
+from grid_map import GridMap
+from solver import SearchObserver
+
+MAGIC = b"ASTRACE1"
+HEADER = struct.Struct("<8sIIii")
+RECORD = struct.Struct("<BIi")
+
+# Event kinds
+OPEN = 0 # First time a cell is put on the open set
+RELAX = 1 # A cell got a better g score and was pushed
+CLOSE = 2 # A cell has been expanded
+STEP = 3 # One iteration of the search finished
+PATH = 4 # A cell of the path found, from start to end
+
+# Bytes buffered before they are written to the file
+FLUSH_SIZE = 1 << 16
+
+class TraceRecorder(SearchObserver):
+    def __init__(self, path, grid, start, end):
+        self.file = open(path, "wb")
+        self.cols = grid.cols
+        self.buffer = bytearray()
+        self.file.write(HEADER.pack(MAGIC, grid.rows, grid.cols, grid.index(*start), grid.index(*end)))
+        self.file.write(bytes(grid.passable))
+        self.file.write(bytes(grid.cost))
+        self.file.write(bytes(grid.portal))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, kind, pos, value=0):
+        self.buffer += RECORD.pack(kind, pos[0] * self.cols + pos[1], value)
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+
+    def on_open(self, pos):
+        self.record(OPEN, pos)
+
+    def on_relax(self, pos, g):
+        self.record(RELAX, pos, g)
+
+    def on_close(self, pos):
+        self.record(CLOSE, pos)
+
+    def on_step(self):
+        self.record(STEP, (0, 0))
+
+    def on_path(self, path):
+        for pos in path:
+            self.record(PATH, pos)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+            self.file.close()
+
+# Open a trace file; returns the GridMap it was recorded on, the start and end as (row, col) and a generator of
+# (kind, row, col, value) events that reads the file a chunk at a time
+def read_trace(path):
+    trace = open(path, "rb")
+    magic, rows, cols, start, end = HEADER.unpack(trace.read(HEADER.size))
+    if magic != MAGIC:
+        trace.close()
+        raise ValueError("%s is not a search trace" % path)
+    size = rows * cols
+    grid = GridMap.from_buffers(rows, cols, bytearray(trace.read(size)), bytearray(trace.read(size)),
+                                bytearray(trace.read(size)))
+
+    def events():
+        with trace:
+            chunk_size = RECORD.size * 4096
+            while True:
+                chunk = trace.read(chunk_size)
+                if len(chunk) < RECORD.size:
+                    return
+                chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]
+                for kind, index, value in RECORD.iter_unpack(chunk):
+                    row, col = divmod(index, cols)
+                    yield kind, row, col, value
+
+    return grid, divmod(start, cols), divmod(end, cols), events()
+
+# Drive the visualiser from a trace: spots are coloured as the search coloured them and draw() is called when policy (a
+# frame_policy.FramePolicy) says so. steps_per_second slows the replay down; None replays as fast as possible
+def replay(events, grid, draw, policy, steps_per_second=None):
+    delay = 1.0 / steps_per_second if steps_per_second else 0.0
+    path = []
+    for kind, row, col, _ in events:
+        if kind == OPEN:
+            grid[row][col].make_open()
+        elif kind == CLOSE:
+            grid[row][col].make_closed()
+        elif kind == STEP:
+            if policy.step():
+                draw()
+            if delay:
+                time.sleep(delay)
+        elif kind == PATH:
+            path.append((row, col))
+    return path
+
+# Replay a trace file in a pygame window
+def main(path, every=1):
+    import pygame
+    from final_version import make_grid, paint_grid
+    from frame_policy import FramePolicy
+    from renderer import GridRenderer
+
+    grid_map, start, end, events = read_trace(path)
+    rows = max(grid_map.rows, grid_map.cols)
+    width = rows * max(1, 750 // rows)
+    win = pygame.display.set_mode((width, width))
+    pygame.display.set_caption("A* Path Finding Algorithm - " + path)
+    renderer = GridRenderer(win, rows, width)
+    grid = make_grid(rows, width, renderer)
+
+    paint_grid(grid, grid_map)
+    grid[start[0]][start[1]].make_start()
+    grid[end[0]][end[1]].make_end()
+    renderer.draw()
+
+    path_cells = replay(events, grid, renderer.draw, FramePolicy(every=every))
+    for row, col in path_cells[1:-1]:
+        grid[row][col].make_path()
+    renderer.draw()
+
+    run = True
+    while run:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+        pygame.time.wait(20)
+    pygame.quit()
+
+if __name__ == "__main__":
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1)
@@ -0,0 +1,315 @@
+"""
+@author: ChingHongFung
+Headless solver: the A* search from final_version.algorithm() with no pygame dependency, so the same search can answer
+path queries from a server or a batch job. The pygame visualiser is plugged in as an optional observer.
+
+Every result carries a SearchStats with the counters of its query. solve(..., timed=True) also splits the time between the
+heuristic, the open list and the rest of the expansion, and on_stats is called with the stats of every query, for sending
+them on to monitoring:
+
+    result = solve(grid, start, end, timed=True, on_stats=lambda stats: export(stats.as_dict()))
+"""
+
+import time
+import weakref
+
+from grid_map import GridMap
+from open_list import make_open_list
+from portal_index import PortalIndex
+from portal_table import PortalTable
+from search_state import CLOSED, OPEN, SearchState
+
+# Use Manhattan distance as a heuristic funciton to estimate the shortest distance between two points; Do not use Euclidean distance becase path cannnot be diagonal
+def h(p1, p2):
+    x1, y1 = p1
+    x2, y2 = p2
+
+    return abs(x1 - x2) + abs(y1 - y2)
+
+# Counters collected while a search runs. With timed=True the time spent in the heuristic and in the open list is measured
+# too (a perf_counter() call either side of each, which slows the search down, so it is off by default); the rest of the
+# search time, neighbor lists, g score updates and observer calls, is put down to expansion
+class SearchStats:
+    def __init__(self, timed=False):
+        self.expanded = 0 # Nodes taken off the open set and considered
+        self.pushed = 0 # Nodes put on the open set
+        self.popped = 0 # Entries taken off the open set: always expanded + stale_pops
+        self.stale_pops = 0 # Entries taken off but not expanded (left behind by a key change, or of no more use to the search)
+        self.relaxations = 0 # Times a node was given a better g score
+        self.heuristic_evaluations = 0 # Heuristic estimates worked out
+        self.portal_checks = 0 # Portals looked at while working out those estimates
+        self.peak_open = 0 # Most nodes on the open set at once
+        self.timed = timed
+        self.heuristic_time = 0.0
+        self.queue_time = 0.0
+        self.expand_time = 0.0
+        self.total_time = 0.0
+        self.started = time.perf_counter()
+
+    # Open list that adds the time spent in it to queue_time when timing, otherwise open_set itself
+    def time_open_list(self, open_set):
+        return TimedOpenList(open_set, self) if self.timed else open_set
+
+    # Heuristic function that adds the time spent in it to heuristic_time when timing, otherwise estimate itself
+    def time_heuristic(self, estimate):
+        if not self.timed:
+            return estimate
+        def timed_estimate(index):
+            started = time.perf_counter()
+            value = estimate(index)
+            self.heuristic_time += time.perf_counter() - started
+            return value
+        return timed_estimate
+
+    # Called once the search is over: collect the counters kept by the open lists and portal indexes it used
+    def finish(self, open_sets=(), portal_indexes=()):
+        # Entries the open lists skipped inside pop()/peek() never reached the search, so are counted here
+        stale = sum(getattr(open_set, "stale", 0) for open_set in open_sets)
+        self.stale_pops += stale
+        self.popped += stale
+        self.portal_checks += sum(portal_index.checked for portal_index in portal_indexes)
+        self.total_time = time.perf_counter() - self.started
+        if self.timed:
+            self.expand_time = max(0.0, self.total_time - self.heuristic_time - self.queue_time)
+
+    def as_dict(self):
+        return {name: value for name, value in vars(self).items() if name != "started"}
+
+# Open list wrapper timing push(), pop() and peek() into stats.queue_time
+class TimedOpenList:
+    def __init__(self, open_set, stats):
+        self.open_set = open_set
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.open_set)
+
+    @property
+    def stale(self):
+        return getattr(self.open_set, "stale", 0)
+
+    def push(self, index, key):
+        started = time.perf_counter()
+        self.open_set.push(index, key)
+        self.stats.queue_time += time.perf_counter() - started
+
+    def pop(self):
+        started = time.perf_counter()
+        index = self.open_set.pop()
+        self.stats.queue_time += time.perf_counter() - started
+        return index
+
+    def peek(self):
+        started = time.perf_counter()
+        entry = self.open_set.peek()
+        self.stats.queue_time += time.perf_counter() - started
+        return entry
+
+# What solve() returns: the path from start to end (both included), its total cost and the search counters
+class SearchResult:
+    def __init__(self, path, cost, stats):
+        self.path = path
+        self.cost = cost
+        self.stats = stats
+        self.found = path is not None
+
+# Observer that does nothing; subclass it and override the hooks needed (e.g. the pygame visualiser in final_version.py)
+class SearchObserver:
+    # A node has been put on the open set
+    def on_open(self, pos):
+        pass
+
+    # A node was given a better g score (and pushed again if it was already open); called before on_open
+    def on_relax(self, pos, g):
+        pass
+
+    # A node has been fully considered and will not be looked at again
+    def on_close(self, pos):
+        pass
+
+    # One iteration of the search has finished
+    def on_step(self):
+        pass
+
+    # A path has been found (list of positions from start to end)
+    def on_path(self, path):
+        pass
+
+# Grid neighbors are worked out on demand inside the search; only the portal edges of each portal group need preparing
+def prepare_neighbors(grid, portals):
+    return PortalTable(grid, portals)
+
+# Everything a search needs about a map that does not change between queries: the grid, its portals and the portal edges.
+# grid may be a GridMap or a list of rows of cell costs (0 for a barrier). portals is a list of portal groups of (row, col)
+# positions; by default the portal groups stored in the grid are used
+class PreparedMap:
+    def __init__(self, grid, portals=None):
+        if not isinstance(grid, GridMap):
+            grid = GridMap.from_costs(grid)
+        if portals is None:
+            portals = grid.portal_groups()
+        else:
+            portals = [[grid.index(*portal) for portal in group] for group in portals]
+        self.grid = grid
+        self.version = grid.version
+        self.portals = [portal for group in portals for portal in group]
+        self.portal_cells = set(self.portals)
+        self.portal_table = prepare_neighbors(grid, portals)
+        self.states = [] # SearchStates handed back by finished searches, see take_state()
+        self.jump_runs = None # Where runs of plain cells stop, for jump point search (jps.RunTable); made by the first one
+
+    # A SearchState for a search on this map: one an earlier search has handed back with give_state() if there is one, so
+    # only the first query pays for allocating it. Each search takes its own, so searches running at the same time never
+    # share one
+    def take_state(self):
+        try:
+            return self.states.pop()
+        except IndexError:
+            return SearchState(len(self.grid))
+
+    def give_state(self, state):
+        self.states.append(state)
+
+# PreparedMap of every GridMap solve() has been given (with its own portal groups), dropped along with the grid
+prepared_maps = weakref.WeakKeyDictionary()
+
+# PreparedMap for grid, reused from an earlier solve() call while the grid has not been edited since
+def prepare_map(grid, portals=None):
+    if portals is not None or not isinstance(grid, GridMap):
+        return PreparedMap(grid, portals)
+    prepared = prepared_maps.get(grid)
+    if prepared is None or prepared.version != grid.version:
+        states = prepared.states if prepared is not None else []
+        prepared = prepared_maps[grid] = PreparedMap(grid)
+        prepared.states = states # The map is the same size, so its search states still fit
+    return prepared
+
+# Main A* search between two cell indices of a PreparedMap. Returns a SearchResult whose path is a list of cell indices
+# state is an optional SearchState to reuse; searches running at the same time each need their own. Without one a state is
+# borrowed from prepared (take_state()) and handed back when the search is over
+# open_list picks the priority queue: "binary" (heapq), "dary" (indexed 4-ary heap) or "bucket" (integer bucket queue)
+# landmarks switches the heuristic from the Manhattan/portal one to the admissible landmark (ALT) bound, see landmarks.py
+# stats is an optional SearchStats to count into (e.g. one with timed=True)
+def search(prepared, start, end, state=None, observer=None, open_list="binary", landmarks=None, stats=None):
+    grid = prepared.grid
+    portal_table = prepared.portal_table
+    portal_cells = prepared.portal_cells
+    if stats is None:
+        stats = SearchStats()
+    timed = stats.timed
+    clock = time.perf_counter
+
+    cols = grid.cols
+    cost = grid.cost
+    end_pos = divmod(end, cols)
+    if landmarks is not None:
+        landmark_targets = landmarks.targets(end)
+        portal_indexes = ()
+    else:
+        portal_index = PortalIndex(grid, prepared.portals)
+        portal_indexes = (portal_index,)
+
+    # Search bookkeeping is kept in a SearchState rather than on the grid; pass one in to reuse it between searches
+    borrowed = state is None
+    if borrowed:
+        state = prepared.take_state()
+    generation = state.begin()
+    stamp, status, g_score = state.stamp, state.status, state.g
+    state.set_g(start, 0, -1)
+    state.make_open(start)
+
+    open_set = stats.time_open_list(make_open_list(open_list, len(grid)))
+    open_set.push(start, 0)
+    stats.pushed += 1
+    fired = {} # Portal groups listed so far, see PortalTable.fire()
+
+    while open_set:
+        current = open_set.pop()
+        stats.popped += 1
+        stats.expanded += 1
+
+        if current == end:
+            path = state.reconstruct_path(end)
+            if borrowed:
+                prepared.give_state(state)
+            stats.finish((open_set,), portal_indexes)
+            if observer:
+                observer.on_path([divmod(index, cols) for index in path])
+            return SearchResult(path, g_score[end], stats)
+
+        current_g = g_score[current]
+        for neighbor in grid.get_neighbors(current) + portal_table.fire(current, current_g, fired):
+            # Moving into a cell costs that cell's cost
+            temp_g_score = current_g + cost[neighbor]
+
+            if stamp[neighbor] != generation or temp_g_score < g_score[neighbor]:
+                state.set_g(neighbor, temp_g_score, current)
+                stats.relaxations += 1
+
+                neighbor_pos = divmod(neighbor, cols)
+                stats.heuristic_evaluations += 1
+                if timed:
+                    started = clock()
+                if landmarks is not None:
+                    f_score = temp_g_score + landmarks.estimate(neighbor, landmark_targets)
+                else:
+                    # Lowest heuristic between the neighbor and a portal that has not been closed yet
+                    min_portal_h = portal_index.nearest(*neighbor_pos)
+                    f_score = min(temp_g_score + h(neighbor_pos, end_pos), temp_g_score + min_portal_h)
+                if timed:
+                    stats.heuristic_time += clock() - started
+
+                # A node already on the open set has its f score updated in place
+                open_set.push(neighbor, f_score)
+                stats.pushed += 1
+                if observer:
+                    observer.on_relax(neighbor_pos, temp_g_score)
+                if status[neighbor] != OPEN:
+                    status[neighbor] = OPEN
+                    if observer:
+                        observer.on_open(neighbor_pos)
+        if len(open_set) > stats.peak_open:
+            stats.peak_open = len(open_set)
+
+        if observer:
+            observer.on_step()
+
+        status[current] = CLOSED
+        if landmarks is None and current in portal_cells:
+            portal_index.close(current) # Do not optimise by attempting to reach closed portals
+        if observer and current != start:
+            observer.on_close(divmod(current, cols))
+
+    if borrowed:
+        prepared.give_state(state)
+    stats.finish((open_set,), portal_indexes)
+    return SearchResult(None, float("inf"), stats)
+
+# Find a path between two (row, col) positions. grid may be a GridMap, a list of rows of cell costs or a PreparedMap; portals
+# is as for PreparedMap. A GridMap is only prepared again once it has been edited (see prepare_map()), and search states
+# are reused from one call to the next, so repeated queries only pay for the cells they explore. The path in the result is
+# a list of (row, col)
+# method is "astar" (search() above), "jps" (jump point search, see jps.py) or "bidirectional" (see bidirectional.py)
+# timed=True times the parts of the search (see SearchStats); on_stats, if given, is called with the stats once it is done
+def solve(grid, start, end, portals=None, observer=None, state=None, open_list="binary", landmarks=None, method="astar",
+          timed=False, on_stats=None):
+    if isinstance(grid, PreparedMap):
+        prepared = grid
+    else:
+        prepared = prepare_map(grid, portals)
+    grid = prepared.grid
+    if method == "astar":
+        method = search
+    elif method == "jps":
+        from jps import jump_search as method # jps.py builds on this module, so import it only when asked for
+    elif method == "bidirectional":
+        from bidirectional import bidirectional_search as method
+    else:
+        raise ValueError("Unknown search method %r" % (method,))
+    stats = SearchStats(timed)
+    result = method(prepared, grid.index(*start), grid.index(*end), state, observer, open_list, landmarks, stats)
+    if result.found:
+        result.path = [grid.get_pos(index) for index in result.path]
+    if on_stats is not None:
+        on_stats(result.stats)
+    return result
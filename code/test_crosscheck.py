@@ -0,0 +1,156 @@
+"""
+@author: ChingHongFung
+Cross-checks of the optimal searches against plain Dijkstra on seeded maps from generators.py. Every method has to return
+the Dijkstra cost, and a path that starts and ends in the right cells, moves only between neighbors or linked portals and
+adds up to that cost; where the end cannot be reached it has to say so. Run with pytest from this folder.
+"""
+
+import random
+
+import pytest
+
+from batch import BatchSolver
+from dijkstra import UNREACHABLE, dijkstra
+from flow_field import FlowField
+from generators import add_portals, cost_terrain, random_obstacles, recursive_division_maze, rooms_and_corridors
+from incremental import IncrementalPlanner
+from landmarks import Landmarks
+from path_cache import PathCache
+from solver import PreparedMap, solve
+
+# Queries tried per map
+QUERIES = 12
+
+# Rounds of map edits the incremental planner is replanned after
+EDIT_ROUNDS = 8
+
+def obstacles():
+    return random_obstacles(40, density=0.3, seed=1)
+
+def maze():
+    return recursive_division_maze(41, seed=2)
+
+def terrain():
+    return cost_terrain(40, scale=16, seed=3, barrier_level=0.75)
+
+def rooms():
+    return rooms_and_corridors(48, seed=4)
+
+def portals():
+    return add_portals(cost_terrain(40, scale=16, seed=5, barrier_level=0.8), count=12, groups=3, seed=6)
+
+MAPS = [obstacles, maze, terrain, rooms, portals]
+
+# Seeded (start, end) pairs of passable cells, as (row, col)
+def queries(grid, seed=0):
+    rng = random.Random(seed)
+    cells = [index for index in range(len(grid)) if grid.passable[index]]
+    return [(grid.get_pos(rng.choice(cells)), grid.get_pos(rng.choice(cells))) for _ in range(QUERIES)]
+
+# Cost from start to end by Dijkstra, None if the end cannot be reached
+def reference(prepared, start, end):
+    grid = prepared.grid
+    distance = dijkstra(grid, prepared.portal_table, grid.index(*start))[grid.index(*end)]
+    return None if distance == UNREACHABLE else distance
+
+# The result matches the Dijkstra cost and its path is a real one of that cost
+def check(prepared, start, end, result):
+    expected = reference(prepared, start, end)
+    if expected is None:
+        assert not result.found
+        return
+    assert result.found
+    assert result.cost == expected
+    check_path(prepared, start, end, result.path, expected)
+
+def check_path(prepared, start, end, path, expected):
+    grid = prepared.grid
+    assert path[0] == tuple(start) and path[-1] == tuple(end)
+    cells = [grid.index(*pos) for pos in path]
+    for previous, index in zip(cells, cells[1:]):
+        assert grid.passable[index]
+        assert index in grid.get_neighbors(previous) + prepared.portal_table.get_neighbors(previous)
+    assert sum(grid.cost[index] for index in cells[1:]) == expected
+
+@pytest.mark.parametrize("make_map", MAPS)
+@pytest.mark.parametrize("method", ["astar", "jps", "bidirectional"])
+@pytest.mark.parametrize("open_list", ["binary", "dary", "bucket"])
+def test_methods(make_map, method, open_list):
+    prepared = PreparedMap(make_map())
+    for start, end in queries(prepared.grid):
+        check(prepared, start, end, solve(prepared, start, end, open_list=open_list, method=method))
+
+@pytest.mark.parametrize("make_map", MAPS)
+@pytest.mark.parametrize("method", ["astar", "jps", "bidirectional"])
+def test_landmarks(make_map, method):
+    prepared = PreparedMap(make_map())
+    landmarks = Landmarks(prepared.grid, count=4)
+    for start, end in queries(prepared.grid, seed=1):
+        check(prepared, start, end, solve(prepared, start, end, landmarks=landmarks, method=method))
+
+@pytest.mark.parametrize("make_map", MAPS)
+def test_batch_solver(make_map):
+    prepared = PreparedMap(make_map())
+    solver = BatchSolver(prepared, open_list="dary")
+    for start, end in queries(prepared.grid, seed=2):
+        check(prepared, start, end, solver.solve(start, end))
+
+@pytest.mark.parametrize("make_map", MAPS)
+def test_path_cache(make_map):
+    grid = make_map()
+    prepared = PreparedMap(grid)
+    cache = PathCache(grid, capacity=QUERIES)
+    pairs = queries(grid, seed=3)
+    for start, end in pairs:
+        check(prepared, start, end, cache.solve(start, end))
+    # Asked again, and from halfway along each path found, so the answers come from whole entries and suffixes
+    paths = [cache.solve(start, end).path for start, end in pairs]
+    for path in paths:
+        if path is not None and len(path) > 2:
+            start, end = path[len(path) // 2], path[-1]
+            check(prepared, start, end, cache.solve(start, end))
+    assert cache.hits == len(pairs) and cache.suffix_hits > 0
+
+@pytest.mark.parametrize("make_map", MAPS)
+def test_flow_field(make_map):
+    prepared = PreparedMap(make_map())
+    grid = prepared.grid
+    for start, end in queries(grid, seed=4)[:4]:
+        field = FlowField(prepared, end)
+        expected = reference(prepared, start, end)
+        assert field.cost_to_end(*start) == expected
+        path = field.path_from(*start)
+        if expected is None:
+            assert path is None
+        else:
+            check_path(prepared, start, end, path, expected)
+
+# D* Lite has to match a Dijkstra over the edited map after every round of barriers, costs, cleared cells and portals, and
+# after the start moves along its path
+@pytest.mark.parametrize("make_map", MAPS)
+def test_incremental_planner(make_map):
+    grid = make_map()
+    rng = random.Random(5)
+    start, end = queries(grid, seed=5)[0]
+    planner = IncrementalPlanner(grid, start, end)
+    check(PreparedMap(grid), start, end, planner.plan())
+    for _ in range(EDIT_ROUNDS):
+        path = planner.plan().path
+        edits = [grid.get_pos(rng.randrange(len(grid))) for _ in range(3)]
+        if path is not None and len(path) > 2:
+            edits.append(path[rng.randrange(1, len(path) - 1)])
+        edits = [pos for pos in edits if pos != start and pos != end]
+        for pos, edit in zip(edits, [grid.make_barrier, grid.add_cost, grid.reset, grid.make_barrier]):
+            edit(*pos)
+        if rng.random() < 0.5:
+            pos = grid.get_pos(rng.randrange(len(grid)))
+            if pos != start and pos != end and not grid.is_barrier(*pos):
+                grid.make_portal(*pos, rng.randrange(3))
+                edits.append(pos)
+        planner.update(edits)
+        result = planner.plan()
+        check(PreparedMap(grid), start, end, result)
+        if result.found and len(result.path) > 1:
+            start = result.path[1]
+            planner.move_start(start)
+            check(PreparedMap(grid), start, end, planner.plan())
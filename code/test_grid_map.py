@@ -0,0 +1,34 @@
+"""
+@author: ChingHongFung
+GridMap edits that used to leave the buffers in a state the searches cannot handle: portal groups out of range and portals
+placed on barriers.
+"""
+
+import pytest
+
+from grid_map import MAX_GROUP, GridMap
+from solver import PreparedMap, solve
+
+@pytest.mark.parametrize("group", [-1, -2, MAX_GROUP + 1, 255])
+def test_portal_group_out_of_range_is_rejected(group):
+    grid = GridMap(4)
+    with pytest.raises(ValueError):
+        grid.make_portal(1, 1, group)
+    assert not grid.is_portal(1, 1) and grid.version == 0
+
+def test_highest_portal_group_is_accepted():
+    grid = GridMap(4)
+    grid.make_portal(1, 1, MAX_GROUP)
+    assert len(grid.portal_groups()) == MAX_GROUP + 1
+
+def test_portal_on_a_barrier_replaces_it():
+    grid = GridMap(1, 7)
+    grid.make_barrier(0, 1)
+    grid.make_barrier(0, 3)
+    grid.make_portal(0, 1, 0)
+    grid.make_portal(0, 5, 0)
+    assert not grid.is_barrier(0, 1) and grid.is_portal(0, 1)
+    assert grid.portal_groups() == [[1, 5]]
+    # The portal cell can be stepped on, and it links the cells next to it with those next to the other portal
+    assert 1 in grid.get_neighbors(0)
+    assert solve(PreparedMap(grid), (0, 0), (0, 6)).cost == 1
@@ -0,0 +1,35 @@
+"""
+@author: ChingHongFung
+Timing checks for jump point search on large open maps, where a search that walks its runs cell by cell instead of looking
+them up takes seconds. The limits leave a wide margin over the measured times (about 0.6 s for the first query on a
+4096 x 4096 map, a few milliseconds after that).
+"""
+
+import time
+
+from grid_map import GridMap
+from solver import PreparedMap, solve
+
+def timed_solve(prepared, start, end):
+    started = time.perf_counter()
+    result = solve(prepared, start, end, method="jps")
+    return result, time.perf_counter() - started
+
+def test_open_map_queries_are_fast():
+    prepared = PreparedMap(GridMap(4096))
+    # The first query works out the runs it touches; a short one must not scan the whole map
+    result, first = timed_solve(prepared, (2048, 2048), (2048, 2050))
+    assert result.cost == 2 and first < 5.0
+    result, again = timed_solve(prepared, (2048, 2048), (2048, 2050))
+    assert result.cost == 2 and again < 0.1
+    result, across = timed_solve(prepared, (10, 10), (4000, 3000))
+    assert result.cost == 3990 + 2990 and across < 0.5
+
+def test_runs_do_not_depend_on_the_end():
+    prepared = PreparedMap(GridMap(300))
+    solve(prepared, (150, 150), (150, 152), method="jps")
+    # Runs worked out for the first query stop at the end of a later one when it lies on them
+    for end in [(150, 299), (0, 150), (299, 0), (151, 151)]:
+        result = solve(prepared, (150, 150), end, method="jps")
+        assert result.cost == abs(end[0] - 150) + abs(end[1] - 150)
+        assert result.path[-1] == end
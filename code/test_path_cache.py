@@ -0,0 +1,29 @@
+"""
+@author: ChingHongFung
+PathCache against solve() when the map changes under it: edits made after paths were cached, and a PreparedMap handed to
+the cache that was made before the last edit.
+"""
+
+from grid_map import GridMap
+from path_cache import PathCache
+from solver import PreparedMap, solve
+
+def test_prepared_map_from_before_an_edit_is_not_used():
+    grid = GridMap(1, 6)
+    prepared = PreparedMap(grid)
+    # Portals next to both ends make the trip one step instead of five
+    grid.make_portal(0, 1, 0)
+    grid.make_portal(0, 4, 0)
+    cache = PathCache(prepared)
+    result = cache.solve((0, 0), (0, 5))
+    assert result.cost == solve(grid, (0, 0), (0, 5)).cost == 1
+
+def test_edits_after_caching_are_seen():
+    grid = GridMap(5)
+    cache = PathCache(grid)
+    assert cache.solve((0, 0), (0, 4)).cost == 4
+    for row in range(4):
+        grid.make_barrier(row, 2)
+    result = cache.solve((0, 0), (0, 4))
+    assert result.cost == solve(grid, (0, 0), (0, 4)).cost == 12
+    assert cache.misses == 2
@@ -0,0 +1,40 @@
+"""
+@author: ChingHongFung
+PortalIndex.nearest() against a loop over every open portal, while portals are closed the way a search closes them, so the
+queries go from the ring scan to looking at the remaining tiles directly.
+"""
+
+import random
+
+import pytest
+
+from grid_map import GridMap
+from portal_index import PortalIndex
+
+@pytest.mark.parametrize("seed", range(4))
+def test_nearest_matches_brute_force(seed):
+    rng = random.Random(seed)
+    grid = GridMap(rng.randrange(20, 90), rng.randrange(20, 90))
+    portals = rng.sample(range(len(grid)), rng.randrange(1, 200))
+    index = PortalIndex(grid, portals, tile_size=rng.choice([None, 1, 3, 7]))
+    open_portals = set(portals)
+    while open_portals:
+        for _ in range(20):
+            row, col = rng.randrange(grid.rows), rng.randrange(grid.cols)
+            expected = min(abs(row - portal // grid.cols) + abs(col - portal % grid.cols) for portal in open_portals)
+            assert index.nearest(row, col) == expected
+        closed = rng.choice(sorted(open_portals))
+        open_portals.remove(closed)
+        index.close(closed)
+    assert index.nearest(0, 0) == float("inf")
+
+# Once most portals are closed a query looks at about as many portals as are left, not at every tile on the way to them
+def test_closed_portals_are_not_walked_over():
+    grid = GridMap(400)
+    portals = list(range(0, len(grid), 53))
+    index = PortalIndex(grid, portals)
+    for portal in portals[:-3]:
+        index.close(portal)
+    rings_before = index.checked
+    index.nearest(0, 0)
+    assert index.checked - rings_before <= 3
@@ -0,0 +1,55 @@
+"""
+@author: ChingHongFung
+PortalTable.fire() against get_neighbors() on maps dense with portals: a search that skips the groups fire() leaves out has
+to reach every cell at the same cost as one that lists every portal edge on each expansion, in both directions, and it
+has to list far fewer cells doing so.
+"""
+
+import heapq
+
+import pytest
+
+from dijkstra import UNREACHABLE, dijkstra
+from generators import add_portals, cost_terrain, random_obstacles
+from solver import PreparedMap
+
+# Dijkstra listing every portal edge of every cell it expands
+def listing_everything(grid, portal_table, source, reverse=False):
+    distance = {source: 0}
+    open_set = [(0, source)]
+    while open_set:
+        d, current = heapq.heappop(open_set)
+        if d > distance[current]:
+            continue
+        for neighbor in grid.get_neighbors(current) + portal_table.get_neighbors(current):
+            temp = d + (grid.cost[current] if reverse else grid.cost[neighbor])
+            if temp < distance.get(neighbor, UNREACHABLE):
+                distance[neighbor] = temp
+                heapq.heappush(open_set, (temp, neighbor))
+    return distance
+
+@pytest.mark.parametrize("seed", range(6))
+def test_fire_matches_every_portal_edge(seed):
+    if seed % 2:
+        grid = cost_terrain(24, scale=6, seed=seed, barrier_level=0.85)
+    else:
+        grid = random_obstacles(24, density=0.25, seed=seed)
+    add_portals(grid, count=120, groups=1 + seed % 3, seed=seed)
+    prepared = PreparedMap(grid)
+    cells = [index for index in range(len(grid)) if grid.passable[index]]
+    for source in cells[::97]:
+        for reverse in (False, True):
+            expected = listing_everything(grid, prepared.portal_table, source, reverse)
+            found = dijkstra(grid, prepared.portal_table, source, reverse)
+            assert all(found[index] == expected.get(index, UNREACHABLE) for index in cells)
+
+# Expanding every border cell at rising g scores, as Dijkstra would, lists each group only until two portals have fired it
+def test_fire_lists_each_group_a_few_times():
+    grid = add_portals(random_obstacles(120, density=0.1, seed=1), count=600, groups=2, seed=2)
+    portal_table = PreparedMap(grid).portal_table
+    fired = {}
+    listed = every = 0
+    for g, index in enumerate(sorted(portal_table.groups_of)):
+        listed += len(portal_table.fire(index, g, fired))
+        every += len(portal_table.get_neighbors(index))
+    assert listed * 50 < every